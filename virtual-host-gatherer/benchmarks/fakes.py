@@ -0,0 +1,1087 @@
+# SPDX-FileCopyrightText: 2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local stand-in backends for the gatherer modules.
+
+Every fake generates an inventory of a given number of hosts and VMs and
+serves it the way the real backend does, without any network access.
+"""
+
+from __future__ import print_function, absolute_import
+import itertools
+import json
+import multiprocessing
+import os
+import ssl
+import subprocess
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from types import SimpleNamespace
+from urllib.parse import urlsplit, parse_qs
+
+
+def vm_uuid(index):
+    """
+    Return the deterministic UUID of a generated VM.
+    """
+
+    return str(uuid.UUID(int=index + 1))
+
+
+def host_uuid(index):
+    """
+    Return the deterministic UUID of a generated host.
+    """
+
+    return str(uuid.UUID(int=(1 << 64) + index))
+
+
+def distribute(hosts, vms):
+    """
+    Spread VMs evenly over hosts.
+
+    :param hosts: Number of hosts.
+    :param vms: Number of VMs.
+    :return: List with the list of VM indices of every host.
+    """
+
+    placement = [list() for _ in range(hosts)]
+    for index in range(vms):
+        placement[index % hosts].append(index)
+    return placement
+
+
+# VMware
+
+
+class _ManagedObject(SimpleNamespace):
+    """
+    Stand-in for a pyVmomi managed object reference.
+    """
+
+    def __str__(self):
+        return f"'vim.{self._type}:{self._moid}'"
+
+    def __hash__(self):
+        return hash(self._moid)
+
+    def __eq__(self, other):
+        return isinstance(other, _ManagedObject) and self._moid == other._moid
+
+
+class _HostSystem(_ManagedObject):
+    """
+    Stand-in for vim.HostSystem.
+    """
+
+
+class _VirtualMachine(_ManagedObject):
+    """
+    Stand-in for vim.VirtualMachine.
+    """
+
+
+class _ComputeResource(_ManagedObject):
+    """
+    Stand-in for vim.ComputeResource and vim.ClusterComputeResource.
+    """
+
+
+class _ContainerView(_ManagedObject):
+    """
+    Stand-in for vim.view.ContainerView.
+
+    Like on a vCenter the view follows the changes of the inventory.
+    """
+
+    @property
+    def view(self):
+        """
+        Return the objects of the view types.
+        """
+
+        if self._types is None:
+            return list()
+        if isinstance(self._container, _ComputeResource):
+            objects = self._container.host
+        else:
+            objects = (
+                self._service_instance.clusters
+                + self._service_instance.hosts
+                + self._service_instance.vms
+            )
+        return [obj for obj in objects if isinstance(obj, self._types)]
+
+    def Destroy(self):  # pylint: disable=invalid-name
+        """
+        Destroy the view.
+        """
+
+        self._types = None
+
+
+# The parts of the pyVmomi type namespaces used by the VMware module.
+FAKE_VIM = SimpleNamespace(
+    ComputeResource=_ComputeResource,
+    HostSystem=_HostSystem,
+    VirtualMachine=_VirtualMachine,
+    view=SimpleNamespace(ContainerView=_ContainerView),
+)
+FAKE_VMODL = SimpleNamespace(
+    query=SimpleNamespace(
+        PropertyCollector=SimpleNamespace(
+            FilterSpec=SimpleNamespace,
+            ObjectSpec=SimpleNamespace,
+            TraversalSpec=SimpleNamespace,
+            PropertySpec=SimpleNamespace,
+            RetrieveOptions=SimpleNamespace,
+            WaitOptions=SimpleNamespace,
+        )
+    )
+)
+
+
+class _ViewManager(object):
+    """
+    Stand-in for the vim.view.ViewManager of a service instance.
+    """
+
+    def __init__(self, service_instance):
+        self.service_instance = service_instance
+
+    # pylint: disable-next=invalid-name,unused-argument
+    def CreateContainerView(self, container, types, recursive):
+        """
+        Create a view of the inventory objects of the given types.
+
+        The root folder holds all objects, a compute resource its hosts.
+        """
+
+        return _ContainerView(
+            _type="ContainerView",
+            _moid="session[fake]view",
+            _service_instance=self.service_instance,
+            _container=container,
+            _types=tuple(types),
+        )
+
+
+class _PropertyCollector(object):
+    """
+    Stand-in for the vmodl.query.PropertyCollector of a service instance.
+
+    Results are paged like on a vCenter, `maxObjects` of the retrieve
+    options and `maxObjectUpdates` of the wait options override the default
+    page size. Updates are found by comparing the property values with the
+    ones reported before, so changes must replace the values.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._results = dict()
+        self._tokens = itertools.count(1)
+        self._filters = list()
+        self._reported = dict()
+        self._updates = list()
+        self._version = ""
+
+    def CreatePropertyCollector(self):  # pylint: disable=invalid-name
+        """
+        Create a property collector of the session.
+        """
+
+        return _PropertyCollector(self.latency)
+
+    # pylint: disable-next=invalid-name,unused-argument
+    def CreateFilter(self, spec, partialUpdates):
+        """
+        Create a filter whose objects are reported by WaitForUpdatesEx.
+        """
+
+        self._filters.append(spec)
+        return SimpleNamespace(Destroy=lambda: self._filters.remove(spec))
+
+    def WaitForUpdatesEx(self, version, options):  # pylint: disable=invalid-name
+        """
+        Return the changes since a version without waiting for new ones.
+        """
+
+        self._call()
+        if version != self._version:
+            raise ValueError(f"invalid collector version '{version}'")
+        if not self._updates:
+            self._updates = self._collect_updates()
+        if not self._updates:
+            return None
+        page_size = getattr(options, "maxObjectUpdates", None) or self.PAGE_SIZE
+        page, self._updates = self._updates[:page_size], self._updates[page_size:]
+        self._version = str(int(self._version or 0) + 1)
+        return SimpleNamespace(
+            version=self._version,
+            truncated=bool(self._updates),
+            filterSet=[SimpleNamespace(objectSet=page)],
+        )
+
+    def _collect_updates(self):
+        updates = list()
+        current = dict()
+        for content in self._contents(self._filters):
+            values = {prop.name: prop.val for prop in content.propSet}
+            key = str(content.obj)
+            current[key] = (content.obj, values)
+            old = self._reported.get(key)
+            if old is None:
+                changes, kind = values, "enter"
+            else:
+                changes = {
+                    name: value
+                    for name, value in values.items()
+                    if name not in old[1] or old[1][name] is not value
+                }
+                kind = "modify"
+            if changes:
+                updates.append(
+                    SimpleNamespace(
+                        kind=kind,
+                        obj=content.obj,
+                        changeSet=[
+                            SimpleNamespace(name=name, op="assign", val=value)
+                            for name, value in changes.items()
+                        ],
+                        missingSet=content.missingSet,
+                    )
+                )
+        for key in set(self._reported) - set(current):
+            updates.append(
+                SimpleNamespace(
+                    kind="leave",
+                    obj=self._reported[key][0],
+                    changeSet=list(),
+                    missingSet=list(),
+                )
+            )
+        self._reported = current
+        return updates
+
+    def RetrievePropertiesEx(self, specs, options):  # pylint: disable=invalid-name
+        """
+        Return the first page of the properties selected by the filter specs.
+        """
+
+        self._call()
+        contents = self._contents(specs)
+        page_size = getattr(options, "maxObjects", None) or self.PAGE_SIZE
+        token = f"token-{next(self._tokens)}"
+        self._results[token] = (contents, page_size)
+        return self._page(token)
+
+    def ContinueRetrievePropertiesEx(self, token):  # pylint: disable=invalid-name
+        """
+        Return the next page of a result.
+        """
+
+        self._call()
+        return self._page(token)
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _page(self, token):
+        contents, page_size = self._results[token]
+        objects = [item for _, item in zip(range(page_size), contents)]
+        if len(objects) < page_size:
+            del self._results[token]
+            token = None
+        return SimpleNamespace(objects=objects, token=token)
+
+    @staticmethod
+    def _contents(specs):
+        for spec in specs:
+            for obj_spec in spec.objectSet:
+                for obj in _traverse(obj_spec.obj, obj_spec.selectSet, obj_spec.skip):
+                    for prop_spec in spec.propSet:
+                        if isinstance(obj, prop_spec.type):
+                            yield _object_content(obj, prop_spec.pathSet)
+
+
+def _traverse(obj, select_set, skip):
+    """
+    Yield an object and the objects reached by the traversal specs.
+    """
+
+    if not skip:
+        yield obj
+    for spec in select_set or []:
+        if isinstance(obj, spec.type):
+            for child in getattr(obj, spec.path):
+                for reached in _traverse(
+                    child, getattr(spec, "selectSet", None), spec.skip
+                ):
+                    yield reached
+
+
+def _object_content(obj, paths):
+    """
+    Return the ObjectContent of an object with the values of the given paths.
+    """
+
+    prop_set = list()
+    missing_set = list()
+    for path in paths:
+        value = obj
+        try:
+            for name in path.split("."):
+                value = getattr(value, name)
+        except AttributeError:
+            missing_set.append(SimpleNamespace(path=path))
+            continue
+        prop_set.append(SimpleNamespace(name=path, val=value))
+    return SimpleNamespace(obj=obj, propSet=prop_set, missingSet=missing_set)
+
+
+class FakeServiceInstance(object):
+    """
+    pyVmomi compatible service instance over a generated inventory.
+
+    The inventory has `datacenters` datacenters with a host folder holding
+    `clusters` clusters each, so it is explored the same way as a real
+    vCenter. Every property collector call is delayed by `latency` seconds.
+    """
+
+    def __init__(self, hosts, vms, datacenters=1, clusters=1, latency=0.0):
+        self.hosts = list()
+        self.vms = list()
+        placement = distribute(hosts, vms)
+        for index in range(hosts):
+            host = _HostSystem(
+                _type="HostSystem",
+                _moid=f"host-{index}",
+                summary=SimpleNamespace(
+                    config=SimpleNamespace(
+                        name=f"esx{index}.example.com",
+                        product=SimpleNamespace(name="VMware ESXi", version="8.0.2"),
+                    )
+                ),
+                hardware=SimpleNamespace(
+                    cpuInfo=SimpleNamespace(
+                        hz=2600000000,
+                        numCpuPackages=2,
+                        numCpuCores=32,
+                        numCpuThreads=64,
+                    ),
+                    cpuPkg=[
+                        SimpleNamespace(
+                            vendor="intel",
+                            description="Intel(R) Xeon(R) Gold 6142 CPU @ 2.60GHz ",
+                        )
+                    ],
+                    systemInfo=SimpleNamespace(
+                        uuid=host_uuid(index), vendor="Fake", serialNumber=str(index)
+                    ),
+                    memorySize=512 * 1024 * 1024 * 1024,
+                ),
+                vm=list(),
+            )
+            for vm_index in placement[index]:
+                virtual_machine = _VirtualMachine(
+                    _type="VirtualMachine",
+                    _moid=f"vm-{vm_index}",
+                    config=SimpleNamespace(
+                        name=f"vm{vm_index}",
+                        uuid=vm_uuid(vm_index),
+                        version="vmx-19" if vm_index % 2 else "vmx-11",
+                    ),
+                    runtime=SimpleNamespace(
+                        powerState=("poweredOn", "poweredOff", "suspended")[
+                            vm_index % 3
+                        ],
+                        host=host,
+                    ),
+                )
+                virtual_machine.summary = SimpleNamespace(vm=virtual_machine)
+                host.vm.append(virtual_machine)
+                self.vms.append(virtual_machine)
+            self.hosts.append(host)
+
+        self.datacenters = list()
+        self.clusters = list()
+        for dc_index in range(datacenters):
+            dc_hosts = self.hosts[dc_index::datacenters]
+            cluster_list = [
+                _ComputeResource(
+                    _type="ClusterComputeResource",
+                    _moid=f"domain-c{dc_index}-{cl_index}",
+                    host=dc_hosts[cl_index::clusters],
+                )
+                for cl_index in range(clusters)
+            ]
+            self.clusters.extend(cluster_list)
+            self.datacenters.append(
+                _ManagedObject(
+                    _type="Datacenter",
+                    _moid=f"datacenter-{dc_index}",
+                    hostFolder=_ManagedObject(
+                        _type="Folder",
+                        _moid=f"group-h{dc_index}",
+                        childEntity=cluster_list,
+                    ),
+                )
+            )
+        self.content = SimpleNamespace(
+            rootFolder=_ManagedObject(
+                _type="Folder", _moid="group-d1", childEntity=self.datacenters
+            ),
+            viewManager=_ViewManager(self),
+            propertyCollector=_PropertyCollector(latency),
+            sessionManager=SimpleNamespace(currentSession=None),
+        )
+        self.logins = 0
+        self._stub = SimpleNamespace(cookie=None)
+
+    def RetrieveContent(self):  # pylint: disable=invalid-name
+        """
+        Return the service content.
+        """
+
+        return self.content
+
+    def login(self):
+        """
+        Start a new session, like SmartConnect.
+        """
+
+        self.logins += 1
+        self._stub.cookie = f'vmware_soap_session="fake-{self.logins}"; Path=/'
+        self.content.sessionManager.currentSession = SimpleNamespace(
+            key=str(self.logins)
+        )
+        return self
+
+    def logout(self):
+        """
+        End the session, like Disconnect.
+        """
+
+        self._stub.cookie = None
+        self.content.sessionManager.currentSession = None
+
+    def churn(self, count):
+        """
+        Toggle the power state of the first `count` VMs.
+        """
+
+        for virtual_machine in self.vms[:count]:
+            runtime = virtual_machine.runtime
+            virtual_machine.runtime = SimpleNamespace(
+                powerState=(
+                    "poweredOff" if runtime.powerState == "poweredOn" else "poweredOn"
+                ),
+                host=runtime.host,
+            )
+
+
+def patch_vmware(module, service_instance):
+    """
+    Make the VMware worker module connect to a fake service instance.
+
+    :param module: The gatherer.modules.VMware module.
+    :param service_instance: FakeServiceInstance to return on connect.
+    :return: void
+    """
+
+    module.SmartConnect = lambda **kwargs: service_instance.login()
+    module.SmartStubAdapter = lambda **kwargs: SimpleNamespace(cookie=None)
+    module.vim = SimpleNamespace(
+        ServiceInstance=lambda moid, stub: _ResumedServiceInstance(
+            service_instance, stub
+        ),
+        **vars(FAKE_VIM),
+    )
+    module.vmodl = FAKE_VMODL
+    module.Disconnect = lambda connection: connection.logout()
+
+
+class _ResumedServiceInstance(object):
+    """
+    Service instance over a stub with a stored session cookie.
+    """
+
+    def __init__(self, service_instance, stub):
+        self._service_instance = service_instance
+        self._stub = stub
+
+    @property
+    def content(self):
+        """
+        Return the service content, without session for an unknown cookie.
+        """
+
+        # pylint: disable-next=protected-access
+        if self._stub.cookie != self._service_instance._stub.cookie:
+            return SimpleNamespace(sessionManager=SimpleNamespace(currentSession=None))
+        return self._service_instance.content
+
+    def RetrieveContent(self):  # pylint: disable=invalid-name
+        """
+        Return the service content.
+        """
+
+        return self.content
+
+    def logout(self):
+        """
+        End the session, like Disconnect.
+        """
+
+        self._service_instance.logout()
+
+
+# Libvirt
+
+
+def libvirt_test_uri(directory, vms):
+    """
+    Write a node definition for the libvirt test driver.
+
+    :param directory: Directory to write the definition to.
+    :param vms: Number of domains to define.
+    :return: test:/// URI of the definition.
+    """
+
+    path = os.path.join(directory, "libvirt-test-node.xml")
+    with open(path, "w", encoding="utf-8") as node_file:
+        node_file.write(
+            "<node><cpu><mhz>2600</mhz><model>x86_64</model><nodes>1</nodes>"
+            "<sockets>2</sockets><cores>16</cores><threads>2</threads>"
+            "<active>64</active><max>64</max></cpu><memory>536870912</memory>\n"
+        )
+        for index in range(vms):
+            node_file.write(
+                f"<domain type='test'><name>vm{index}</name>"
+                f"<uuid>{vm_uuid(index)}</uuid><memory>1048576</memory>"
+                "<vcpu>2</vcpu><os><type>hvm</type></os></domain>\n"
+            )
+        node_file.write("</node>\n")
+    return f"test://{path}"
+
+
+# HTTP servers
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """
+    Request handler dispatching to the `routes` of the server.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, keep-alive requests would
+    # wait for delayed acknowledgements.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._dispatch("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        route = self.server.routes.get((method, url.path.rstrip("/")))
+        if route is None:
+            self.send_error(404)
+            return
+        payload = route(query, body)
+        if isinstance(payload, dict):
+            payload = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def _serve(factory, args, certfile, conn):
+    """
+    Serve the routes built by a factory, reporting the port through a pipe.
+    """
+
+    server = _ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+    server.routes = factory(*args)
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeServer(object):
+    """
+    HTTP(S) server in a separate process, so that its memory does not count
+    against the gatherer measured in this process.
+    """
+
+    def __init__(self, factory, args, certfile=None):
+        self.factory = factory
+        self.args = args
+        self.certfile = certfile
+        self.port = None
+        self._process = None
+
+    def start(self):
+        """
+        Start the server process.
+
+        :return: Port the server listens on.
+        """
+
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.factory, self.args, self.certfile, child)
+        )
+        self._process.daemon = True
+        self._process.start()
+        self.port = parent.recv()
+        return self.port
+
+    def stop(self):
+        """
+        Stop the server process.
+        """
+
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+
+def self_signed_certificate(directory):
+    """
+    Create a self-signed certificate for 127.0.0.1 with openssl.
+
+    :param directory: Directory to write the PEM file to.
+    :return: Path of the PEM file holding the key and the certificate.
+    """
+
+    path = os.path.join(directory, "fake-server.pem")
+    subprocess.check_call(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "1",
+            "-subj",
+            "/CN=127.0.0.1",
+            "-addext",
+            "subjectAltName=IP:127.0.0.1",
+            "-keyout",
+            path,
+            "-out",
+            path + ".crt",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    with open(path, "a", encoding="utf-8") as pem, open(
+        path + ".crt", encoding="utf-8"
+    ) as crt:
+        pem.write(crt.read())
+    return path
+
+
+def _paged(entities, query):
+    """
+    Slice a Prism v2 entity list by the page and count query parameters.
+    """
+
+    total = len(entities)
+    if "count" in query:
+        count = int(query["count"])
+        page = int(query.get("page", 1))
+        entities = entities[(page - 1) * count : page * count]
+    else:
+        count, page = total, 1
+    return {
+        "metadata": {
+            "grand_total_entities": total,
+            "total_entities": total,
+            "count": count,
+            "page": page,
+        },
+        "entities": entities,
+    }
+
+
+def prism_v2_routes(hosts, vms, detached=0):
+    """
+    Build the routes of a Prism Element v2 API with a generated inventory.
+
+    :param hosts: Number of hosts.
+    :param vms: Number of VMs placed on the hosts.
+    :param detached: Number of additional VMs without a host.
+    :return: Dictionary of route handlers.
+    """
+
+    host_entities = [
+        {
+            "name": f"ahv{index}",
+            "uuid": host_uuid(index),
+            "hypervisor_full_name": "Nutanix 20230302.100173",
+            "num_cpu_sockets": 2,
+            "num_cpu_cores": 32,
+            "num_cpu_threads": 64,
+            "cpu_capacity_in_hz": 83200000000,
+            "cpu_model": "Intel(R) Xeon(R) Gold 6142 CPU @ 2.60GHz",
+            "memory_capacity_in_bytes": 549755813888,
+        }
+        for index in range(hosts)
+    ]
+    vm_entities = list()
+    for index, vm_indices in enumerate(distribute(hosts, vms)):
+        for vm_index in vm_indices:
+            vm_entities.append(
+                {
+                    "name": f"vm{vm_index}",
+                    "uuid": vm_uuid(vm_index),
+                    "host_uuid": host_uuid(index),
+                    "power_state": ("on", "off", "suspended")[vm_index % 3],
+                    "description": "generated by the gatherer benchmark " * 4,
+                    "num_vcpus": 2,
+                    "memory_mb": 4096,
+                }
+            )
+    for vm_index in range(vms, vms + detached):
+        vm_entities.append(
+            {
+                "name": f"vm{vm_index}",
+                "uuid": vm_uuid(vm_index),
+                "power_state": "off",
+            }
+        )
+    prefix = "/PrismGateway/services/rest/v2.0"
+    return {
+        ("GET", prefix + "/hosts"): lambda query, body: _paged(host_entities, query),
+        ("GET", prefix + "/vms"): lambda query, body: _paged(vm_entities, query),
+    }
+
+
+def _listed(entities, kind, body):
+    """
+    Slice a Prism v3 entity list by the length and offset of a list request.
+    """
+
+    offset = int(body.get("offset") or 0)
+    length = int(body.get("length") or 20)
+    return {
+        "api_version": "3.1",
+        "metadata": {
+            "kind": kind,
+            "total_matches": len(entities),
+            "length": len(entities[offset : offset + length]),
+            "offset": offset,
+        },
+        "entities": entities[offset : offset + length],
+    }
+
+
+def prism_v3_routes(hosts, vms, clusters=1, detached=0):
+    """
+    Build the routes of a Prism Central v3 API with a generated inventory.
+
+    The hosts are spread over the clusters, Prism Central lists itself as an
+    additional cluster. The detached VMs are spread over the clusters too.
+
+    :param hosts: Number of hosts.
+    :param vms: Number of VMs placed on the hosts.
+    :param clusters: Number of clusters.
+    :param detached: Number of additional VMs without a host.
+    :return: Dictionary of route handlers.
+    """
+
+    cluster_uuids = [host_uuid(100000000 + index) for index in range(clusters)]
+    cluster_entities = [
+        {
+            "metadata": {"kind": "cluster", "uuid": uuid},
+            "status": {
+                "name": f"cluster{index}",
+                "resources": {"config": {"service_list": ["AOS"]}},
+            },
+        }
+        for index, uuid in enumerate(cluster_uuids)
+    ]
+    cluster_entities.append(
+        {
+            "metadata": {"kind": "cluster", "uuid": host_uuid(200000000)},
+            "status": {
+                "name": "prism-central",
+                "resources": {"config": {"service_list": ["PRISM_CENTRAL"]}},
+            },
+        }
+    )
+
+    def cluster_reference(index):
+        return {"kind": "cluster", "uuid": cluster_uuids[index % clusters]}
+
+    host_entities = [
+        {
+            "metadata": {"kind": "host", "uuid": host_uuid(index)},
+            "status": {
+                "name": f"ahv{index}",
+                "cluster_reference": cluster_reference(index),
+                "resources": {
+                    "hypervisor": {
+                        "hypervisor_full_name": "Nutanix 20230302.100173",
+                        "ip": f"10.0.{index // 256 % 256}.{index % 256}",
+                    },
+                    "num_cpu_sockets": 2,
+                    "num_cpu_cores": 32,
+                    "cpu_capacity_hz": 83200000000,
+                    "cpu_model": "Intel(R) Xeon(R) Gold 6142 CPU @ 2.60GHz",
+                    "memory_capacity_mib": 524288,
+                },
+            },
+        }
+        for index in range(hosts)
+    ]
+    vm_entities = list()
+    for index, vm_indices in enumerate(distribute(hosts, vms)):
+        for vm_index in vm_indices:
+            vm_entities.append(
+                {
+                    "metadata": {"kind": "vm", "uuid": vm_uuid(vm_index)},
+                    "spec": {"name": f"vm{vm_index}"},
+                    "status": {
+                        "name": f"vm{vm_index}",
+                        "cluster_reference": cluster_reference(index),
+                        "resources": {
+                            "host_reference": {
+                                "kind": "host",
+                                "uuid": host_uuid(index),
+                            },
+                            "power_state": ("ON", "OFF", "SUSPENDED")[vm_index % 3],
+                            "num_sockets": 2,
+                            "memory_size_mib": 4096,
+                        },
+                        "description": "generated by the gatherer benchmark " * 4,
+                    },
+                }
+            )
+    for vm_index in range(vms, vms + detached):
+        vm_entities.append(
+            {
+                "metadata": {"kind": "vm", "uuid": vm_uuid(vm_index)},
+                "spec": {"name": f"vm{vm_index}"},
+                "status": {
+                    "name": f"vm{vm_index}",
+                    "cluster_reference": cluster_reference(vm_index),
+                    "resources": {"power_state": "OFF"},
+                },
+            }
+        )
+    prefix = "/api/nutanix/v3"
+    return {
+        ("POST", prefix + "/clusters/list"): lambda query, body: _listed(
+            cluster_entities, "cluster", body
+        ),
+        ("POST", prefix + "/hosts/list"): lambda query, body: _listed(
+            host_entities, "host", body
+        ),
+        ("POST", prefix + "/vms/list"): lambda query, body: _listed(
+            vm_entities, "vm", body
+        ),
+    }
+
+
+def kubernetes_routes(nodes):
+    """
+    Build the routes of a Kubernetes API server with generated nodes.
+
+    :param nodes: Number of nodes.
+    :return: Dictionary of route handlers.
+    """
+
+    items = [kubernetes_node(index) for index in range(nodes)]
+
+    def list_nodes(query, body):
+        if query.get("watch") in ("1", "true", "True"):
+            # No changes, end the watch request after a while.
+            time.sleep(min(int(query.get("timeoutSeconds") or 1), 1))
+            return b""
+        start = int(query.get("continue") or 0)
+        limit = int(query.get("limit") or 0) or len(items)
+        end = start + limit
+        metadata = {"resourceVersion": "1"}
+        if end < len(items):
+            metadata["continue"] = str(end)
+        return {
+            "apiVersion": "v1",
+            "kind": "NodeList",
+            "metadata": metadata,
+            "items": items[start:end],
+        }
+
+    return {("GET", "/api/v1/nodes"): list_nodes}
+
+
+def kubernetes_node(index):
+    """
+    Return a generated Node object with the bulk of a real one.
+    """
+
+    return {
+        "metadata": {
+            "name": f"node{index}",
+            "uid": host_uuid(index),
+            "resourceVersion": "1",
+            "labels": {
+                "kubernetes.io/arch": "amd64",
+                "kubernetes.io/hostname": f"node{index}",
+                "kubernetes.io/os": "linux",
+            },
+            "annotations": {
+                f"example.com/annotation-{key}": "x" * 64 for key in range(10)
+            },
+        },
+        "spec": {"podCIDR": f"10.{index // 256 % 256}.{index % 256}.0/24"},
+        "status": {
+            "capacity": {"cpu": "16", "memory": "65831088Ki", "pods": "110"},
+            "allocatable": {"cpu": "16", "memory": "65728688Ki", "pods": "110"},
+            "conditions": [
+                {
+                    "type": condition,
+                    "status": "False",
+                    "lastHeartbeatTime": "2025-01-01T00:00:00Z",
+                    "lastTransitionTime": "2025-01-01T00:00:00Z",
+                    "reason": "KubeletHasSufficient" + condition,
+                    "message": "kubelet has sufficient " + condition,
+                }
+                for condition in ("MemoryPressure", "DiskPressure", "PIDPressure")
+            ],
+            "addresses": [
+                {
+                    "type": "InternalIP",
+                    "address": f"192.168.{index // 256 % 256}.{index % 256}",
+                },
+                {"type": "Hostname", "address": f"node{index}"},
+            ],
+            "nodeInfo": {
+                "machineID": uuid.UUID(int=index).hex,
+                "systemUUID": host_uuid(index),
+                "bootID": vm_uuid(index),
+                "kernelVersion": "6.4.0-150600.23.25-default",
+                "osImage": "SUSE Linux Enterprise Server 15 SP6",
+                "containerRuntimeVersion": "containerd://1.7.21",
+                "kubeletVersion": "v1.30.4",
+                "kubeProxyVersion": "v1.30.4",
+                "operatingSystem": "linux",
+                "architecture": "amd64",
+            },
+            "images": [
+                {
+                    "names": [f"registry.example.com/image{image}@sha256:" + "0" * 64],
+                    "sizeBytes": 123456789,
+                }
+                for image in range(20)
+            ],
+        },
+    }
+
+
+def kubeconfig(directory, port):
+    """
+    Write a kubeconfig pointing to a fake API server.
+
+    :param directory: Directory to write the kubeconfig to.
+    :param port: Port of the fake API server.
+    :return: Path of the kubeconfig and the name of its context.
+    """
+
+    path = os.path.join(directory, "kubeconfig")
+    config = {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [
+            {"name": "bench", "cluster": {"server": f"http://127.0.0.1:{port}"}}
+        ],
+        "users": [{"name": "bench", "user": {"token": "bench"}}],
+        "contexts": [
+            {"name": "bench", "context": {"cluster": "bench", "user": "bench"}}
+        ],
+        "current-context": "bench",
+    }
+    with open(path, "w", encoding="utf-8") as config_file:
+        json.dump(config, config_file)
+    return path, "bench"
+
+
+# File
+
+
+def file_fixture(directory, hosts, vms):
+    """
+    Write a host map in the gatherer output format for the File module.
+
+    :param directory: Directory to write the fixture to.
+    :param hosts: Number of hosts.
+    :param vms: Number of VMs.
+    :return: Path of the fixture.
+    """
+
+    output = dict()
+    for index, vm_indices in enumerate(distribute(hosts, vms)):
+        name = f"host{index}"
+        output[name] = {
+            "type": "kvm",
+            "name": name,
+            "hostIdentifier": host_uuid(index),
+            "os": "libvirt",
+            "osVersion": "10.0",
+            "totalCpuSockets": 2,
+            "totalCpuCores": 32,
+            "totalCpuThreads": 64,
+            "cpuMhz": 2600,
+            "cpuArch": "x86_64",
+            "ramMb": 524288,
+            "vms": {f"vm{vm}": vm_uuid(vm) for vm in vm_indices},
+            "optionalVmData": {f"vm{vm}": {"vmState": "running"} for vm in vm_indices},
+        }
+    path = os.path.join(directory, "file-fixture.json")
+    with open(path, "w", encoding="utf-8") as fixture:
+        json.dump(output, fixture)
+    return path
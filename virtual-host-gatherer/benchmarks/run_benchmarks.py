@@ -0,0 +1,320 @@
+#!/usr/bin/python3
+
+# SPDX-FileCopyrightText: 2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# pylint: disable=invalid-name
+
+"""
+Scale benchmark of the gatherer modules against local stand-in backends.
+
+Every case runs in its own process, so the reported peak RSS belongs to a
+single module run. Example:
+
+  benchmarks/run_benchmarks.py --modules VMware,NutanixAHV --vms 10,1000,100000
+"""
+
+from __future__ import print_function, absolute_import
+import argparse
+import json
+import logging
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "lib"))
+sys.path.insert(0, HERE)
+
+# pylint: disable=wrong-import-position
+import fakes
+
+MODULES = ["VMware", "Libvirt", "NutanixAHV", "Kubernetes", "File"]
+
+
+def _current_rss_mb():
+    """
+    Return the current resident set size of this process in MB.
+    """
+
+    with open("/proc/self/statm", encoding="utf-8") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+
+
+def _setup_vmware(hosts, vms, directory, params):
+    # pylint: disable=unused-argument
+    from gatherer.modules import VMware
+
+    service_instance = fakes.FakeServiceInstance(
+        hosts, vms, clusters=max(1, hosts // 16)
+    )
+    fakes.patch_vmware(VMware, service_instance)
+    worker = VMware.VMware()
+    worker.set_node(
+        {"hostname": "fake", "port": 443, "username": "u", "password": "p", **params}
+    )
+    return worker, None
+
+
+def _setup_libvirt(hosts, vms, directory, params):
+    # pylint: disable=unused-argument
+    from gatherer.modules import Libvirt
+
+    worker = Libvirt.Libvirt()
+    if not worker.valid():
+        return None, None
+    worker.set_node({"uri": fakes.libvirt_test_uri(directory, vms), **params})
+    return worker, None
+
+
+def _setup_nutanix(hosts, vms, directory, params):
+    from gatherer.modules import NutanixAHV
+
+    certfile = fakes.self_signed_certificate(directory)
+    os.environ["SSL_CERT_FILE"] = certfile + ".crt"
+    if str(params.get("prism_central")).lower() in ("1", "true", "yes"):
+        routes = fakes.prism_v3_routes, (hosts, vms, max(1, hosts // 16))
+    else:
+        routes = fakes.prism_v2_routes, (hosts, vms)
+    server = fakes.FakeServer(*routes, certfile=certfile)
+    port = server.start()
+    worker = NutanixAHV.NutanixAHV()
+    worker.set_node(
+        {
+            "hostname": "127.0.0.1",
+            "port": port,
+            "username": "u",
+            "password": "p",
+            **params,
+        }
+    )
+    return worker, server.stop
+
+
+def _setup_kubernetes(hosts, vms, directory, params):
+    # pylint: disable=unused-argument
+    from gatherer.modules import Kubernetes
+
+    worker = Kubernetes.Kubernetes()
+    if not worker.valid():
+        return None, None
+    server = fakes.FakeServer(fakes.kubernetes_routes, (hosts,))
+    port = server.start()
+    config, context = fakes.kubeconfig(directory, port)
+    worker.set_node({"kubeconfig": config, "context": context, **params})
+    return worker, server.stop
+
+
+def _setup_file(hosts, vms, directory, params):
+    from gatherer.modules import File
+
+    worker = File.File()
+    worker.set_node({"url": fakes.file_fixture(directory, hosts, vms), **params})
+    return worker, None
+
+
+SETUP = {
+    "VMware": _setup_vmware,
+    "Libvirt": _setup_libvirt,
+    "NutanixAHV": _setup_nutanix,
+    "Kubernetes": _setup_kubernetes,
+    "File": _setup_file,
+}
+
+
+def run_case(module, hosts, vms, warm=False, params=None):
+    """
+    Run a single benchmark case in this process.
+
+    With `warm` the worker is run once as persistent worker before the
+    measured run, like in the daemon mode. `params` are added to the node
+    description.
+
+    :return: Dictionary of the measurements.
+    """
+
+    directory = tempfile.mkdtemp(prefix="gatherer-bench-")
+    cleanup = None
+    try:
+        try:
+            worker, cleanup = SETUP[module](hosts, vms, directory, params or dict())
+        except ImportError as exc:
+            return {"module": module, "skipped": str(exc)}
+        if worker is None:
+            return {"module": module, "skipped": "required packages not installed"}
+
+        if warm:
+            worker.persistent = True
+            worker.run()
+            worker.reset_phase_timings()
+
+        setup_rss = _current_rss_mb()
+        start = time.monotonic()
+        output = worker.run() or dict()
+        seconds = time.monotonic() - start
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        if warm:
+            worker.close()
+
+        found_vms = sum(len(host.get("vms") or dict()) for host in output.values())
+        return {
+            "module": module,
+            "warm": warm,
+            "hosts": hosts,
+            "vms": vms,
+            "found_hosts": len(output),
+            "found_vms": found_vms,
+            "seconds": seconds,
+            "vms_per_second": found_vms / seconds if seconds else None,
+            "setup_rss_mb": setup_rss,
+            "peak_rss_mb": peak_rss,
+            "phases": worker.phase_timings(),
+        }
+    finally:
+        if cleanup is not None:
+            cleanup()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _print_table(results):
+    """
+    Print the results as a table, followed by the scaling of every module.
+
+    The scaling exponent is fitted between the smallest and the largest case:
+    1.0 means the run time grows linearly with the VM count, 2.0 quadratic.
+    """
+
+    print(
+        f"{'module':<12} {'hosts':>7} {'vms':>8} {'found h':>8} {'found':>8} "
+        f"{'seconds':>9} "
+        f"{'vms/s':>10} {'us/vm':>8} {'rss MB':>8} {'peak MB':>8}"
+    )
+    measured = dict()
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['module']:<12} skipped: {result['skipped']}")
+            continue
+        measured.setdefault(result["module"], list()).append(result)
+        us_per_vm = (
+            result["seconds"] * 1e6 / result["found_vms"] if result["found_vms"] else 0
+        )
+        print(
+            f"{result['module']:<12} {result['hosts']:>7} {result['vms']:>8} "
+            f"{result['found_hosts']:>8} {result['found_vms']:>8} "
+            f"{result['seconds']:>9.3f} "
+            f"{result['vms_per_second'] or 0:>10.0f} {us_per_vm:>8.1f} "
+            f"{result['setup_rss_mb']:>8.1f} {result['peak_rss_mb']:>8.1f}"
+        )
+
+    for module, cases in measured.items():
+        first, last = cases[0], cases[-1]
+        if last["vms"] <= first["vms"] or not first["seconds"]:
+            continue
+        exponent = math.log(last["seconds"] / first["seconds"]) / math.log(
+            float(last["vms"]) / first["vms"]
+        )
+        print(
+            f"{module}: run time grows with VMs^{exponent:.2f} "
+            f"from {first['vms']} to {last['vms']} VMs"
+        )
+
+
+def main():
+    """
+    Run the benchmark cases, each in a subprocess.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "--modules",
+        default=",".join(MODULES),
+        help=f"comma separated modules to benchmark. Default: {','.join(MODULES)}",
+    )
+    parser.add_argument(
+        "--vms",
+        default="10,1000,10000",
+        help="comma separated VM counts. Default: 10,1000,10000",
+    )
+    parser.add_argument(
+        "--vms-per-host",
+        type=int,
+        default=50,
+        help="VMs per host, determines the host count. Default: 50",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="measure the second run of a persistent worker, as in daemon mode",
+    )
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=list(),
+        metavar="KEY=VALUE",
+        help="add a parameter to the node descriptions, e.g. page_size=500",
+    )
+    parser.add_argument("--json", help="write the results to a JSON file")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--hosts", type=int, help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+
+    if opts.case:
+        logging.basicConfig(level=logging.CRITICAL)
+        params = dict(param.split("=", 1) for param in opts.param)
+        print(
+            json.dumps(
+                run_case(opts.case, opts.hosts, int(opts.vms), opts.warm, params)
+            )
+        )
+        return
+
+    results = list()
+    for module in opts.modules.split(","):
+        if module not in SETUP:
+            parser.error(f"unknown module '{module}'")
+        for vms in [int(count) for count in opts.vms.split(",")]:
+            hosts = max(1, vms // opts.vms_per_host)
+            proc = subprocess.run(
+                [sys.executable, __file__, "--case", module]
+                + ["--hosts", str(hosts), "--vms", str(vms)]
+                + (["--warm"] if opts.warm else [])
+                + [f"--param={param}" for param in opts.param],
+                stdout=subprocess.PIPE,
+                check=False,
+            )
+            try:
+                result = json.loads(proc.stdout.decode("utf-8").splitlines()[-1])
+            except (IndexError, ValueError):
+                result = {"module": module, "skipped": f"failed ({proc.returncode})"}
+            results.append(result)
+            if "skipped" in result:
+                break
+
+    _print_table(results)
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=4, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
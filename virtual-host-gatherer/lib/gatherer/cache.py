@@ -0,0 +1,169 @@
+# SPDX-FileCopyrightText: 2015-2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2015--2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+On-disk cache of the worker results.
+"""
+
+from __future__ import absolute_import
+import errno
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+
+def is_secret(key):
+    """
+    Return True, if a node parameter holds a secret.
+
+    :param key: Name of the node parameter.
+    :return: Boolean
+    """
+
+    key = key.lower()
+    return key.startswith("pass") or "password" in key or "secret" in key
+
+
+class ResultCache(object):
+    """
+    Cache of the worker results keyed by the node definition.
+    """
+
+    def __init__(self, cache_dir, max_age=None, module_ttl=None):
+        """
+        Constructor.
+
+        :param cache_dir: Directory to keep the cached results in.
+        :param max_age: Default maximum age of a cached result in seconds.
+        :param module_ttl: Dictionary of maximum ages by module name.
+        :return:
+        """
+
+        self.log = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.module_ttl = module_ttl or dict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(node):
+        """
+        Return the cache key of a node.
+
+        Secrets are left out, so the key does not change when a password is
+        rotated and the cache files do not depend on credentials.
+
+        :param node: Dictionary of the node description.
+        :return: Hex digest of the node definition.
+        """
+
+        public = {key: value for key, value in node.items() if not is_secret(key)}
+        return hashlib.sha256(
+            json.dumps(public, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def ttl(self, modname):
+        """
+        Return the maximum age of cached results of a module.
+
+        :param modname: Name of the module.
+        :return: Maximum age in seconds or None, if results are not cached.
+        """
+
+        return self.module_ttl.get(modname, self.max_age)
+
+    def get(self, node_id, modname, node):
+        """
+        Look up a fresh result for a node.
+
+        :param node_id: Id of the node in the output.
+        :param modname: Name of the module.
+        :param node: Dictionary of the node description.
+        :return: Tuple of a hit flag and the cached result.
+        """
+
+        ttl = self.ttl(modname)
+        if not ttl:
+            return False, None
+        try:
+            with open(self._path(node), encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+            age = time.time() - entry["timestamp"]
+            if entry.get("module") == modname and 0 <= age <= ttl:
+                self._count(hit=True)
+                self.log.info(
+                    "Cache hit for node '%s', result is %d seconds old.",
+                    node_id,
+                    age,
+                )
+                return True, entry["result"]
+        except (IOError, OSError, ValueError, KeyError, TypeError) as exc:
+            self.log.debug("No usable cache entry for '%s': %s", node_id, exc)
+        self._count(hit=False)
+        self.log.info("Cache miss for node '%s'.", node_id)
+        return False, None
+
+    def put(self, modname, node, result):
+        """
+        Store the result of a node.
+
+        :param modname: Name of the module.
+        :param node: Dictionary of the node description.
+        :param result: Result of the worker.
+        :return: void
+        """
+
+        entry = {"module": modname, "timestamp": time.time(), "result": result}
+        tmp_path = None
+        try:
+            try:
+                os.makedirs(self.cache_dir, 0o700)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+            handle, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as cache_file:
+                json.dump(entry, cache_file)
+            os.rename(tmp_path, self._path(node))
+        except (IOError, OSError, TypeError, ValueError) as exc:
+            self.log.warning("Unable to write cache entry: %s", exc)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _path(self, node):
+        """
+        Return the path of the cache file of a node.
+        """
+
+        return os.path.join(self.cache_dir, self.key(node) + ".json")
+
+    def _count(self, hit):
+        """
+        Count a cache lookup.
+        """
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
@@ -0,0 +1,378 @@
+# SPDX-FileCopyrightText: 2015-2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2015--2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Daemon mode serving scan requests over a local Unix socket.
+
+A request is a line with the request options as JSON object followed by
+the input file, terminated by shutting down the writing side of the
+connection. The daemon answers with the output the command line tool would
+write, then a NUL byte and a JSON status line, and closes the connection.
+"""
+
+from __future__ import absolute_import
+import errno
+import hashlib
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+# Separates the output from the status of a response. JSON output never
+# contains it, control characters are escaped.
+_END = "\0"
+
+
+class WorkerPool(object):
+    """
+    Worker instances kept between scan requests, keyed by the node definition.
+    """
+
+    def __init__(self, idle_timeout):
+        """
+        Constructor.
+
+        :param idle_timeout: Seconds after which an unused worker is closed.
+        :return:
+        """
+
+        self.log = logging.getLogger(__name__)
+        self.idle_timeout = idle_timeout
+        # key -> [worker, busy, last use]
+        self._entries = dict()
+        self._keys = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(node):
+        """
+        Return the key of a node.
+
+        Unlike the result cache key the secrets are included, so changed
+        credentials get a new worker. The key is never written to disk.
+
+        :param node: Dictionary of the node description.
+        :return: Hex digest of the node definition.
+        """
+
+        return hashlib.sha256(
+            json.dumps(node, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def acquire(self, factory, node):
+        """
+        Return the kept worker of a node, creating it on first use.
+
+        A node listed twice in one request gets a fresh, non persistent
+        worker while the kept one is busy.
+
+        :param factory: Callable creating a new worker instance.
+        :param node: Dictionary of the node description.
+        :return: Worker instance.
+        """
+
+        key = self.key(node)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                worker = factory()
+                worker.persistent = True
+                entry = self._entries[key] = [worker, False, time.monotonic()]
+                self._keys[id(worker)] = key
+            elif entry[1]:
+                return factory()
+            entry[1] = True
+        entry[0].reset_phase_timings()
+        entry[0].reset_failed()
+        return entry[0]
+
+    def release(self, worker):
+        """
+        Return a worker to the pool after a finished scan.
+
+        :param worker: Worker instance returned by acquire().
+        :return: void
+        """
+
+        with self._lock:
+            entry = self._entries.get(self._keys.get(id(worker)))
+            if entry is not None and entry[0] is worker:
+                entry[1] = False
+                entry[2] = time.monotonic()
+
+    def discard(self, worker):
+        """
+        Forget a worker which may still be running, e.g. after a timeout.
+
+        The worker is not closed, its connections are dropped with it.
+
+        :param worker: Worker instance returned by acquire().
+        :return: void
+        """
+
+        with self._lock:
+            key = self._keys.pop(id(worker), None)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is worker:
+                del self._entries[key]
+
+    def expire(self):
+        """
+        Close the workers which have not been used within the idle timeout.
+
+        :return: Number of closed workers.
+        """
+
+        now = time.monotonic()
+        expired = list()
+        with self._lock:
+            for key, (worker, busy, last_use) in list(self._entries.items()):
+                if not busy and now - last_use >= self.idle_timeout:
+                    del self._entries[key]
+                    self._keys.pop(id(worker), None)
+                    expired.append(worker)
+        for worker in expired:
+            self._close(worker)
+        if expired:
+            self.log.info("Closed %d idle workers", len(expired))
+        return len(expired)
+
+    def close(self):
+        """
+        Close all kept workers.
+
+        :return: void
+        """
+
+        with self._lock:
+            workers = [entry[0] for entry in self._entries.values()]
+            self._entries.clear()
+            self._keys.clear()
+        for worker in workers:
+            self._close(worker)
+
+    def _close(self, worker):
+        """
+        Close a worker, logging instead of raising errors.
+        """
+
+        try:
+            worker.close()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.warning("Closing a %s worker failed: %s", type(worker), exc)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle one scan request.
+    """
+
+    def handle(self):
+        # Ignore connections closed without a request, like the check of a
+        # starting daemon whether the socket is in use.
+        if self.rfile.peek(1):
+            self.server.scan(self.rfile, self.wfile)
+
+
+class GathererDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server running the scan requests on a gatherer.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, gatherer, path, idle_timeout):
+        """
+        Constructor.
+
+        :param gatherer: Gatherer instance to run the requests.
+        :param path: Path of the Unix socket.
+        :param idle_timeout: Seconds after which an unused worker is closed.
+        :return:
+        """
+
+        self.log = logging.getLogger(__name__)
+        self.gatherer = gatherer
+        self.workers = WorkerPool(idle_timeout)
+        gatherer.workers = self.workers
+        # Requests share the workers, the cache and the metrics.
+        self._scan_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self._remove_stale_socket(path)
+        # The requests carry credentials, only the owner may connect.
+        umask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.__init__(self, path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        self._inode = os.stat(path).st_ino
+
+    @staticmethod
+    def _remove_stale_socket(path):
+        """
+        Remove the socket file left behind by a daemon which is gone.
+
+        :param path: Path of the Unix socket.
+        :return: void
+        """
+
+        try:
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                return
+        except OSError:
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError as exc:
+            if exc.errno == errno.ECONNREFUSED:
+                os.unlink(path)
+            elif exc.errno != errno.ENOENT:
+                raise
+        else:
+            raise OSError(errno.EADDRINUSE, f"A daemon is already serving {path}")
+        finally:
+            probe.close()
+
+    def scan(self, rfile, wfile):
+        """
+        Run a scan request and write its output.
+
+        :param rfile: Binary stream of the request.
+        :param wfile: Binary stream of the response.
+        :return: void
+        """
+
+        input_file = io.TextIOWrapper(rfile, encoding="utf-8")
+        output_file = io.TextIOWrapper(wfile, encoding="utf-8")
+        started = time.monotonic()
+        status = {"status": "ok"}
+        try:
+            options = json.loads(input_file.readline())
+            if not isinstance(options, dict):
+                raise ValueError("Request options are not a JSON object")
+            with self._scan_lock:
+                self.gatherer.process(input_file, output_file, options)
+            self.log.info("Request served in %.2f seconds", time.monotonic() - started)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.exception("Request failed: %s", exc)
+            status = {"status": "error", "error": str(exc)}
+        try:
+            output_file.write(_END + json.dumps(status) + "\n")
+            output_file.flush()
+        except OSError as exc:
+            self.log.warning("Unable to answer the request: %s", exc)
+        finally:
+            # Leave closing the socket streams to the request handler.
+            input_file.detach()
+            output_file.detach()
+
+    def run(self):
+        """
+        Serve requests until SIGTERM or SIGINT.
+
+        :return: void
+        """
+
+        def terminate(signum, frame):  # pylint: disable=unused-argument
+            raise SystemExit(0)
+
+        signal.signal(signal.SIGTERM, terminate)
+        reaper = threading.Thread(target=self._reap, name="worker-expiry")
+        reaper.daemon = True
+        reaper.start()
+        self.log.warning("Serving scan requests on %s", self.server_address)
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stopped.set()
+            self.server_close()
+            try:
+                # Leave a socket of a daemon started later on the path alone.
+                if os.stat(self.server_address).st_ino == self._inode:
+                    os.unlink(self.server_address)
+            except OSError:
+                pass
+            self.workers.close()
+            self.log.warning("Daemon stopped")
+
+    def _reap(self):
+        """
+        Close idle workers periodically.
+        """
+
+        interval = min(max(self.workers.idle_timeout / 2.0, 1), 60)
+        while not self._stopped.wait(interval):
+            self.workers.expire()
+
+
+def request(path, input_file, output_file, options=None, chunk_size=0x10000):
+    """
+    Send a scan request to a daemon and copy its response.
+
+    :param path: Path of the Unix socket of the daemon.
+    :param input_file: Binary stream of the input.
+    :param output_file: Binary stream to write the output to.
+    :param options: Dictionary of the options for the request.
+    :param chunk_size: Number of bytes to transfer at once.
+    :return: Number of bytes of output received.
+    """
+
+    received = 0
+    status = None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sock.sendall((json.dumps(options or dict()) + "\n").encode("utf-8"))
+        while True:
+            chunk = input_file.read(chunk_size)
+            if not chunk:
+                break
+            sock.sendall(chunk)
+        sock.shutdown(socket.SHUT_WR)
+        while True:
+            chunk = sock.recv(chunk_size)
+            if not chunk:
+                break
+            if status is not None:
+                status += chunk
+                continue
+            end = chunk.find(_END.encode("utf-8"))
+            if end >= 0:
+                chunk, status = chunk[:end], chunk[end + 1 :]
+            output_file.write(chunk)
+            received += len(chunk)
+    finally:
+        sock.close()
+    output_file.flush()
+
+    if status is None:
+        raise IOError(f"Incomplete response from the daemon on {path}, see its log")
+    status = json.loads(status.decode("utf-8"))
+    if status.get("status") != "ok":
+        raise IOError(f"Request to the daemon on {path} failed: {status.get('error')}")
+    return received
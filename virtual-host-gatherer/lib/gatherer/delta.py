@@ -0,0 +1,185 @@
+# SPDX-FileCopyrightText: 2015-2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2015--2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Snapshots of the gatherer output and change sets against them.
+"""
+
+from __future__ import absolute_import
+import json
+import os
+import tempfile
+from gatherer.infile import iter_nodes
+
+_VM_KEYS = ("vms", "optionalVmData")
+
+
+def load_snapshot(path, fmt="json"):
+    """
+    Load a previous gatherer output.
+
+    :param path: Path of the snapshot file.
+    :param fmt: Format of the snapshot, "json" or "ndjson".
+    :return: Dictionary of the host maps by node id.
+    """
+
+    with open(path, encoding="utf-8") as snapshot_file:
+        if fmt != "ndjson":
+            snapshot = json.load(snapshot_file)
+            if not isinstance(snapshot, dict):
+                raise ValueError(f"{path} is not a JSON object of nodes")
+            return snapshot
+        snapshot = dict()
+        for record in iter_nodes(snapshot_file):
+            snapshot[record["id"]] = record["hosts"]
+    return snapshot
+
+
+def diff_hosts(old, new):
+    """
+    Compute the changes between two host maps of a node.
+
+    :param old: Previous host map or None.
+    :param new: Current host map or None, if the node could not be scanned.
+    :return: Change set dictionary or None, if the node could not be scanned.
+    """
+
+    if new is None:
+        return None
+    old = old or dict()
+
+    delta = dict()
+    added = {name: host for name, host in new.items() if name not in old}
+    removed = sorted(name for name in old if name not in new)
+    changed = dict()
+    for name, host in new.items():
+        if name in old:
+            host_delta = _diff_host(old[name], host)
+            if host_delta:
+                changed[name] = host_delta
+    if added:
+        delta["added"] = added
+    if removed:
+        delta["removed"] = removed
+    if changed:
+        delta["changed"] = changed
+    return delta
+
+
+def _diff_host(old, new):
+    """
+    Compute the changes of a single host record.
+
+    :param old: Previous host record.
+    :param new: Current host record.
+    :return: Change set dictionary, empty if nothing changed.
+    """
+
+    delta = dict()
+    fields = {
+        key: value
+        for key, value in new.items()
+        if key not in _VM_KEYS and old.get(key) != value
+    }
+    # Fields missing from the current record are reported as null.
+    fields.update({key: None for key in old if key not in _VM_KEYS and key not in new})
+    if fields:
+        delta["host"] = fields
+
+    old_vms, new_vms = old.get("vms") or dict(), new.get("vms") or dict()
+    old_data = old.get("optionalVmData") or dict()
+    new_data = new.get("optionalVmData") or dict()
+    vms = dict()
+    vm_data = dict()
+    for vm_name, vm_uuid in new_vms.items():
+        if vm_name not in old_vms:
+            vms.setdefault("added", dict())[vm_name] = vm_uuid
+        elif old_vms[vm_name] != vm_uuid:
+            vms.setdefault("changed", dict())[vm_name] = vm_uuid
+        if vm_name in new_data and old_data.get(vm_name) != new_data[vm_name]:
+            vm_data[vm_name] = new_data[vm_name]
+    removed = sorted(vm_name for vm_name in old_vms if vm_name not in new_vms)
+    if removed:
+        vms["removed"] = removed
+    if vms:
+        delta["vms"] = vms
+    if vm_data:
+        delta["optionalVmData"] = vm_data
+    return delta
+
+
+class SnapshotWriter(object):
+    """
+    Write a snapshot node by node, replacing the file once it is complete.
+    """
+
+    def __init__(self, path, fmt="json"):
+        """
+        Constructor.
+
+        :param path: Path of the snapshot file.
+        :param fmt: Format of the snapshot, "json" or "ndjson".
+        :return:
+        """
+
+        self.path = path
+        self.ndjson = fmt == "ndjson"
+        self._separator = "{\n"
+        handle, self._tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+        )
+        self._file = os.fdopen(handle, "w", encoding="utf-8")
+
+    def write(self, node_id, hosts):
+        """
+        Add the host map of a node.
+
+        :param node_id: Id of the node.
+        :param hosts: Host map of the node.
+        :return: void
+        """
+
+        if self.ndjson:
+            self._file.write(json.dumps({"id": node_id, "hosts": hosts}) + "\n")
+            return
+        self._file.write(f"{self._separator}{json.dumps(node_id)}: {json.dumps(hosts)}")
+        self._separator = ",\n"
+
+    def commit(self):
+        """
+        Replace the snapshot file with the written one.
+
+        :return: void
+        """
+
+        if not self.ndjson:
+            # An empty snapshot did not write the opening brace yet.
+            self._file.write("{}\n" if self._separator == "{\n" else "\n}\n")
+        self._file.close()
+        os.rename(self._tmp_path, self.path)
+
+    def close(self):
+        """
+        Discard the written snapshot if it was not committed.
+
+        :return: void
+        """
+
+        if not self._file.closed:
+            self._file.close()
+            os.unlink(self._tmp_path)
@@ -24,13 +24,89 @@ from __future__ import print_function, absolute_import
 import sys
 import os
 import argparse
+import asyncio
+import importlib.util
 import json
 import logging
 import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from logging.handlers import RotatingFileHandler
 from os.path import expanduser
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+from gatherer.cache import ResultCache
+from gatherer.daemon import GathererDaemon, request
+from gatherer.delta import SnapshotWriter, diff_hosts, load_snapshot
+from gatherer.infile import iter_nodes
+from gatherer.metrics import ScanMetrics
+from gatherer.modules import MANIFEST, WorkerInterface, run_in_thread
+from collections import OrderedDict, deque
+
+# Options of a --socket client which apply to its request on the daemon.
+_REQUEST_OPTIONS = (
+    "format",
+    "since_snapshot",
+    "save_snapshot",
+    "metrics",
+    "metrics_prom",
+    "jobs",
+    "module_jobs",
+    "use_async",
+    "timeout",
+    "scan_budget",
+)
+# Request options naming files, resolved by the client.
+_REQUEST_PATHS = ("since_snapshot", "save_snapshot", "metrics", "metrics_prom")
+
+
+def _module_value(value, minimum):
+    """
+    Parse a MODULE=N command line value.
+
+    :param value: Option value as given on the command line.
+    :param minimum: Smallest allowed number.
+    :return: Tuple of the module name and the number.
+    """
+
+    modname, _, number = value.partition("=")
+    try:
+        number = int(number)
+    except ValueError:
+        number = minimum - 1
+    if not modname or number < minimum:
+        raise argparse.ArgumentTypeError(
+            f"'{value}' is not in the format MODULE=N with N >= {minimum}"
+        )
+    return modname, number
+
+
+def _job_count(value):
+    """
+    Parse a positive number of parallel scans.
+    """
+
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a number N >= 1")
+    return number
+
+
+def _module_limit(value):
+    """
+    Parse a MODULE=N command line value limiting parallel scans.
+    """
+
+    return _module_value(value, 1)
+
+
+def _module_ttl(value):
+    """
+    Parse a MODULE=SECONDS command line value for the result cache.
+    """
+
+    return _module_value(value, 0)
 
 
 def parse_options():
@@ -40,7 +116,10 @@ def parse_options():
 
     home = expanduser("~")
     if home == "/root":
+        cache_destination = "/var/cache/virtual-host-gatherer"
         home = "/var/log"
+    else:
+        cache_destination = f"{home}/.cache/virtual-host-gatherer"
     log_destination = f"{home}/gatherer.log"
     parser = argparse.ArgumentParser(
         description="Process args for retrieving all the Virtual Machines"
@@ -49,7 +128,7 @@ def parse_options():
         "-i",
         "--infile",
         action="store",
-        help="json input file or '-' to read from stdin",
+        help="json or ndjson input file or '-' to read from stdin",
     )
     parser.add_argument(
         "-o",
@@ -74,6 +153,116 @@ def parse_options():
         default=log_destination,
         help=f"path to logfile. Default: {log_destination}",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=_job_count,
+        default=1,
+        help="number of nodes to scan in parallel. Default: 1",
+    )
+    parser.add_argument(
+        "--module-jobs",
+        action="append",
+        type=_module_limit,
+        metavar="MODULE=N",
+        help="limit the number of parallel scans for a module (repeatable)",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="scan the nodes with the asyncio engine",
+    )
+    parser.add_argument(
+        "--timeout",
+        action="store",
+        type=float,
+        metavar="SECONDS",
+        help="deadline for scanning a single node (implies --async)",
+    )
+    parser.add_argument(
+        "--scan-budget",
+        action="store",
+        type=float,
+        metavar="SECONDS",
+        help="deadline for scanning all nodes (implies --async)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        action="store",
+        choices=["json", "ndjson"],
+        default="json",
+        help="output format. 'ndjson' writes one line per node as soon as "
+        "it is scanned. Default: json",
+    )
+    parser.add_argument(
+        "--since-snapshot",
+        action="store",
+        metavar="FILE",
+        help="write only the changes against a previous output",
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        action="store",
+        metavar="FILE",
+        help="store the full output as snapshot for a later --since-snapshot",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store",
+        metavar="FILE",
+        help="write per-node timing and size metrics as JSON",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        action="store",
+        metavar="FILE",
+        help="write per-node metrics for the Prometheus textfile collector",
+    )
+    parser.add_argument(
+        "--max-age",
+        action="store",
+        type=int,
+        metavar="SECONDS",
+        help="serve node results from the cache if they are not older",
+    )
+    parser.add_argument(
+        "--module-ttl",
+        action="append",
+        type=_module_ttl,
+        metavar="MODULE=SECONDS",
+        help="maximum age of cached results for a module, 0 disables "
+        "caching of the module (repeatable)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        action="store",
+        default=cache_destination,
+        help=f"directory of the result cache. Default: {cache_destination}",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store",
+        metavar="SOCKET",
+        help="run as daemon serving scan requests on a Unix socket",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        action="store",
+        type=float,
+        default=900,
+        metavar="SECONDS",
+        help="close backend connections of the daemon unused for this long. "
+        "Default: 900",
+    )
+    parser.add_argument(
+        "--socket",
+        action="store",
+        metavar="SOCKET",
+        help="send the input to a daemon started with --serve",
+    )
 
     return parser.parse_args()
 
@@ -103,6 +292,11 @@ class Gatherer(object):
             self._setup_logging()
 
         self.modules = dict()
+        self._module_names = None
+        self._unavailable = set()
+        self.cache = None
+        self.metrics = None
+        self.workers = None
 
     def _setup_logging(self):
         """
@@ -130,16 +324,25 @@ class Gatherer(object):
         """
         List available modules.
 
+        Modules described in the manifest are listed without importing them.
+
         :return: Dictionary of available modules.
         """
 
         params = dict()
-        if not self.modules:
-            self._load_modules()
-        for modname, inst in list(self.modules.items()):
+        for modname in self._get_module_names():
+            if modname in MANIFEST:
+                if not self._module_available(modname):
+                    continue
+                parameters = MANIFEST[modname]["parameters"]
+            else:
+                instance = self._get_module(modname)
+                if instance is None:
+                    continue
+                parameters = instance.parameters()
             moditem = OrderedDict([("module", modname)])
             params[modname] = OrderedDict(
-                list(moditem.items()) + list(inst.parameters().items())
+                list(moditem.items()) + list(parameters.items())
             )
         return params
 
@@ -150,31 +353,96 @@ class Gatherer(object):
         :return: void
         """
 
-        if not self.modules:
-            self._load_modules()
-
         if self.options.infile == "-":
-            mgm_nodes = json.load(sys.stdin)
+            self.process(sys.stdin)
         else:
             with open(self.options.infile, encoding="utf-8") as input_file:
-                mgm_nodes = json.load(input_file)
+                self.process(input_file)
 
-        output = dict()
-        for node in mgm_nodes:
-            if self.options.verbose >= 2:
-                self.log.debug("Input Node: '%s'", self._remove_passwords(node))
+    def _run_client(self):
+        """
+        Send the input to a gatherer daemon and write its output.
 
-            if "module" not in node:
-                self.log.error("Skipping undefined module in the input file.")
-                continue
-            modname = node["module"]
-            if modname not in self.modules:
-                self.log.error("Skipping unsupported module '%s'.", modname)
-                continue
+        :return: void
+        """
 
-            worker = self.modules[modname]
-            worker.set_node(node)
-            output[node.get("id", str(uuid.uuid4()))] = worker.run()
+        options = {name: getattr(self.options, name, None) for name in _REQUEST_OPTIONS}
+        # The daemon may run in another working directory.
+        for name in _REQUEST_PATHS:
+            if options[name]:
+                options[name] = os.path.abspath(options[name])
+
+        if self.options.infile == "-":
+            input_file = sys.stdin.buffer
+        else:
+            input_file = open(self.options.infile, "rb")
+        try:
+            if self.options.outfile:
+                with open(self.options.outfile, "wb") as output_file:
+                    request(self.options.socket, input_file, output_file, options)
+            else:
+                request(self.options.socket, input_file, sys.stdout.buffer, options)
+        finally:
+            if input_file is not sys.stdin.buffer:
+                input_file.close()
+
+    def process(self, input_file, output_file=None, options=None):
+        """
+        Scan the nodes of an input and write the output.
+
+        :param input_file: Text stream of the json or ndjson input.
+        :param output_file: Text stream for the output. Default: the outfile
+            option or stdout.
+        :param options: Dictionary of options replacing the command line
+            options for this input, e.g. the ones of a daemon request.
+        :return: void
+        """
+
+        if options:
+            saved = self.options
+            self.options = argparse.Namespace(**dict(vars(saved), **options))
+            try:
+                self.process(input_file, output_file)
+            finally:
+                self.options = saved
+            return
+
+        self.cache = self.metrics = None
+        max_age = getattr(self.options, "max_age", None)
+        module_ttl = dict(getattr(self.options, "module_ttl", None) or [])
+        if max_age is not None or module_ttl:
+            self.cache = ResultCache(self.options.cache_dir, max_age, module_ttl)
+        metrics_json = getattr(self.options, "metrics", None)
+        metrics_prom = getattr(self.options, "metrics_prom", None)
+        if metrics_json or metrics_prom:
+            self.metrics = ScanMetrics()
+
+        self._scan_and_write(iter_nodes(input_file), output_file)
+
+        if self.cache is not None:
+            self.log.info(
+                "Result cache: %d hits, %d misses", self.cache.hits, self.cache.misses
+            )
+        if metrics_json:
+            self.metrics.write_json(metrics_json)
+        if metrics_prom:
+            self.metrics.write_prometheus(metrics_prom)
+
+    def _scan_and_write(self, mgm_nodes, output_file=None):
+        """
+        Scan the nodes and write the output in the requested format.
+
+        :param mgm_nodes: Iterable of the node descriptions.
+        :param output_file: Text stream for the output or None.
+        :return: void
+        """
+
+        if getattr(self.options, "format", "json") == "ndjson":
+            self._run_ndjson(mgm_nodes, output_file)
+            return
+
+        output = dict()
+        self._scan_with_snapshots(mgm_nodes, output.__setitem__)
 
         if self.options.verbose >= 2:
             self.log.debug(
@@ -182,7 +450,12 @@ class Gatherer(object):
                 json.dumps(output, sort_keys=True, indent=4, separators=(",", ": ")),
             )
 
-        if self.options.outfile:
+        if output_file is not None:
+            json.dump(
+                output, output_file, sort_keys=True, indent=4, separators=(",", ": ")
+            )
+            output_file.write("\n")
+        elif self.options.outfile:
             with open(self.options.outfile, "w", encoding="utf-8") as input_file:
                 json.dump(
                     output, input_file, sort_keys=True, indent=4, separators=(",", ": ")
@@ -190,6 +463,423 @@ class Gatherer(object):
         else:
             print(json.dumps(output, sort_keys=True, indent=4, separators=(",", ": ")))
 
+    def _run_ndjson(self, mgm_nodes, output_file=None):
+        """
+        Scan the nodes and write one JSON line per node as soon as it is done.
+
+        :param mgm_nodes: Iterable of the node descriptions.
+        :param output_file: Text stream for the output or None.
+        :return: void
+        """
+
+        close_output = False
+        if output_file is None:
+            if self.options.outfile:
+                output_file = open(self.options.outfile, "w", encoding="utf-8")
+                close_output = True
+            else:
+                output_file = sys.stdout
+
+        def emit(node_id, hosts):
+            line = json.dumps({"id": node_id, "hosts": hosts}, sort_keys=True)
+            if self.options.verbose >= 2:
+                self.log.debug("Output: '%s'", line)
+            output_file.write(line + "\n")
+            output_file.flush()
+
+        try:
+            self._scan_with_snapshots(mgm_nodes, emit)
+        finally:
+            if close_output:
+                output_file.close()
+
+    def _scan_with_snapshots(self, mgm_nodes, emit):
+        """
+        Scan the nodes, diffing against and saving snapshots as requested.
+
+        :param mgm_nodes: Iterable of the node descriptions.
+        :param emit: Callable taking node id and result of every scanned node.
+        :return: void
+        """
+
+        since = getattr(self.options, "since_snapshot", None)
+        save = getattr(self.options, "save_snapshot", None)
+        if not since and not save:
+            self._scan(mgm_nodes, emit)
+            return
+
+        fmt = getattr(self.options, "format", "json")
+        previous = dict()
+        if since:
+            try:
+                previous = load_snapshot(since, fmt)
+            except (IOError, OSError, ValueError, KeyError, TypeError) as exc:
+                self.log.warning("Snapshot not loaded, reporting all hosts: %s", exc)
+        writer = SnapshotWriter(save, fmt) if save else None
+
+        def snapshot_emit(node_id, hosts):
+            old = previous.pop(node_id, None)
+            if writer is not None:
+                # Keep the previous state of nodes which failed to scan.
+                writer.write(node_id, hosts if hosts is not None else old)
+            emit(node_id, diff_hosts(old, hosts) if since else hosts)
+
+        try:
+            self._scan(mgm_nodes, snapshot_emit)
+            if since:
+                # Nodes left in the snapshot are no longer in the input.
+                for node_id, old in previous.items():
+                    emit(node_id, diff_hosts(old, dict()))
+            if writer is not None:
+                writer.commit()
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _scan(self, mgm_nodes, emit):
+        """
+        Scan all management nodes.
+
+        With more than one job the nodes are scanned on a pool of worker
+        threads, otherwise one after another. Nodes of a module running at
+        its --module-jobs limit wait in a queue of the module, so they do not
+        hold up the nodes of other modules.
+
+        :param mgm_nodes: Iterable of the node descriptions.
+        :param emit: Callable taking node id and result of every scanned node.
+        :return: void
+        """
+
+        if self._use_async():
+            self._scan_async(mgm_nodes, emit)
+            return
+
+        jobs = getattr(self.options, "jobs", 1) or 1
+
+        if jobs <= 1:
+            for node in mgm_nodes:
+                task = self._prepare_node(node)
+                if task is not None:
+                    node_id, modname = task
+                    emit(node_id, self._scan_node(node_id, modname, node))
+            return
+
+        limits = dict(getattr(self.options, "module_jobs", None) or [])
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            pending = dict()
+            running = dict()
+            deferred = dict()
+
+            def submit(node_id, modname, node):
+                running[modname] = running.get(modname, 0) + 1
+                future = executor.submit(self._scan_node, node_id, modname, node)
+                pending[future] = node_id, modname
+
+            def emit_done():
+                # Wait for at least one scan, start the next deferred node of
+                # its module and emit all finished ones.
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id, modname = pending.pop(future)
+                    running[modname] -= 1
+                    if deferred.get(modname):
+                        submit(*deferred[modname].popleft())
+                    emit(node_id, future.result())
+
+            try:
+                for node in mgm_nodes:
+                    task = self._prepare_node(node)
+                    if task is None:
+                        continue
+                    node_id, modname = task
+                    limit = limits.get(modname)
+                    if limit is not None and running.get(modname, 0) >= limit:
+                        deferred.setdefault(modname, deque()).append(
+                            (node_id, modname, node)
+                        )
+                        continue
+                    submit(node_id, modname, node)
+                    while len(pending) >= jobs:
+                        emit_done()
+                while pending:
+                    emit_done()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _use_async(self):
+        """
+        Return True, if the asyncio engine was requested.
+        """
+
+        return bool(
+            getattr(self.options, "use_async", False)
+            or getattr(self.options, "timeout", None)
+            or getattr(self.options, "scan_budget", None)
+        )
+
+    def _scan_async(self, mgm_nodes, emit):
+        """
+        Scan all management nodes on an asyncio event loop.
+
+        Nodes which do not finish within their deadline or the global scan
+        budget get None as result, like nodes that failed to scan.
+
+        :param mgm_nodes: Iterable of the node descriptions.
+        :param emit: Callable taking node id and result of every scanned node.
+        :return: void
+        """
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._async_scan(mgm_nodes, emit))
+        finally:
+            loop.close()
+
+    async def _async_scan(self, mgm_nodes, emit):
+        """
+        Coroutine scanning all management nodes.
+
+        :param mgm_nodes: Iterable of the node descriptions.
+        :param emit: Callable taking node id and result of every scanned node.
+        :return: void
+        """
+
+        loop = asyncio.get_event_loop()
+        budget = getattr(self.options, "scan_budget", None)
+        deadline = loop.time() + budget if budget else None
+        jobs = asyncio.Semaphore(getattr(self.options, "jobs", 1) or 1)
+        module_slots = {
+            modname: asyncio.Semaphore(limit)
+            for modname, limit in (getattr(self.options, "module_jobs", None) or [])
+        }
+
+        tasks = OrderedDict()
+        modules = dict()
+        started = loop.time()
+        nodes = iter(mgm_nodes)
+        done = object()
+        while True:
+            # Read the input in a thread, scans already started keep going.
+            node = await run_in_thread(next, nodes, done)
+            if node is done:
+                break
+            task = self._prepare_node(node)
+            if task is None:
+                continue
+            node_id, modname = task
+            tasks[node_id] = asyncio.ensure_future(
+                self._async_scan_node(
+                    node_id, modname, node, jobs, module_slots.get(modname), emit
+                )
+            )
+            modules[node_id] = modname
+
+        if tasks:
+            timeout = max(deadline - loop.time(), 0) if deadline else None
+            _, pending = await asyncio.wait(list(tasks.values()), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+        for node_id, task in tasks.items():
+            if task.cancelled() or not task.done():
+                self.log.warning(
+                    "Scan budget of %s seconds exceeded, no result for node '%s'.",
+                    budget,
+                    node_id,
+                )
+                if self.metrics is not None:
+                    self.metrics.record(
+                        node_id,
+                        modules[node_id],
+                        None,
+                        loop.time() - started,
+                        timed_out=True,
+                    )
+                emit(node_id, None)
+            else:
+                # Raise the errors of failed scans like the other engines.
+                task.result()
+
+    async def _async_scan_node(self, node_id, modname, node, jobs, slot, emit):
+        """
+        Coroutine scanning a single node.
+
+        :param node_id: Id of the node in the output.
+        :param modname: Name of the module to use.
+        :param node: Dictionary of the node description.
+        :param jobs: Semaphore limiting the overall parallel scans.
+        :param slot: Semaphore limiting the parallel scans of the module or None.
+        :param emit: Callable taking node id and result of the scanned node.
+        :return: void
+        """
+
+        hit, result = self._cached_result(node_id, modname, node)
+        if hit:
+            emit(node_id, result)
+            return
+
+        timeout = getattr(self.options, "timeout", None)
+        timed_out = False
+        worker = self._acquire_worker(modname, node)
+        # Wait for the module slot first, so nodes of a module at its limit
+        # do not hold job slots other modules could use.
+        if slot is not None:
+            await slot.acquire()
+        try:
+            async with jobs:
+                started = time.monotonic()
+                try:
+                    worker.set_node(node)
+                    result = await asyncio.wait_for(worker.run_async(), timeout)
+                except asyncio.TimeoutError:
+                    self.log.warning(
+                        "Scanning node '%s' timed out after %s seconds.",
+                        node_id,
+                        timeout,
+                    )
+                    result = None
+                    timed_out = True
+                    if self.workers is not None:
+                        # The worker is still running in its thread.
+                        self.workers.discard(worker)
+                finally:
+                    self._release_worker(worker)
+        finally:
+            if slot is not None:
+                slot.release()
+        self._finish_node(node_id, modname, node, result, worker, started, timed_out)
+        emit(node_id, result)
+
+    def _prepare_node(self, node):
+        """
+        Check a node description before scanning it.
+
+        :param node: Dictionary of the node description.
+        :return: Tuple of node id and module name or None to skip the node.
+        """
+
+        if self.options.verbose >= 2:
+            self.log.debug("Input Node: '%s'", self._remove_passwords(node))
+
+        if "module" not in node:
+            self.log.error("Skipping undefined module in the input file.")
+            return None
+        modname = node["module"]
+        if self._get_module(modname) is None:
+            self.log.error("Skipping unsupported module '%s'.", modname)
+            return None
+
+        return node.get("id", str(uuid.uuid4())), modname
+
+    def _scan_node(self, node_id, modname, node):
+        """
+        Scan a single node.
+
+        :param node_id: Id of the node in the output.
+        :param modname: Name of the module to use.
+        :param node: Dictionary of the node description.
+        :return: Dictionary of the worker result.
+        """
+
+        hit, result = self._cached_result(node_id, modname, node)
+        if hit:
+            return result
+
+        worker = self._acquire_worker(modname, node)
+        started = time.monotonic()
+        try:
+            worker.set_node(node)
+            result = worker.run()
+        finally:
+            self._release_worker(worker)
+        self._finish_node(node_id, modname, node, result, worker, started)
+        return result
+
+    def _acquire_worker(self, modname, node):
+        """
+        Return the worker instance to scan a node with.
+
+        In daemon mode the worker kept for the node is reused, otherwise
+        every scan gets a fresh instance.
+
+        :param modname: Name of the module.
+        :param node: Dictionary of the node description.
+        :return: Worker instance.
+        """
+
+        factory = self.modules[modname].__class__
+        if self.workers is None:
+            worker = factory()
+        else:
+            worker = self.workers.acquire(factory, node)
+        worker.cache_dir = getattr(self.options, "cache_dir", None)
+        return worker
+
+    def _release_worker(self, worker):
+        """
+        Hand a worker back after its scan.
+
+        :param worker: Worker instance returned by _acquire_worker().
+        :return: void
+        """
+
+        if self.workers is not None:
+            self.workers.release(worker)
+
+    def _cached_result(self, node_id, modname, node):
+        """
+        Look up the result of a node in the cache, if caching is enabled.
+
+        :param node_id: Id of the node in the output.
+        :param modname: Name of the module.
+        :param node: Dictionary of the node description.
+        :return: Tuple of a hit flag and the cached result.
+        """
+
+        if self.cache is None:
+            return False, None
+        hit, result = self.cache.get(node_id, modname, node)
+        if hit and self.metrics is not None:
+            self.metrics.record(node_id, modname, result, 0.0, cached=True)
+        return hit, result
+
+    def _finish_node(
+        self, node_id, modname, node, result, worker, started, timed_out=False
+    ):
+        """
+        Record the metrics of a scanned node and cache a successful result.
+
+        Empty results and results of scans the worker flagged as failed are
+        not cached, modules may return partial output after an error.
+
+        :param node_id: Id of the node in the output.
+        :param modname: Name of the module.
+        :param node: Dictionary of the node description.
+        :param result: Result of the worker.
+        :param worker: Worker instance which scanned the node.
+        :param started: Monotonic time the scan started.
+        :param timed_out: True, if the scan exceeded its deadline.
+        :return: void
+        """
+
+        if self.metrics is not None:
+            self.metrics.record(
+                node_id,
+                modname,
+                result,
+                time.monotonic() - started,
+                worker.phase_timings(),
+                timed_out=timed_out,
+            )
+        if (
+            self.cache is not None
+            and result
+            and not worker.failed()
+            and self.cache.ttl(modname)
+        ):
+            self.cache.put(modname, node, result)
+
     def main(self):
         """
         Application start.
@@ -223,10 +913,18 @@ class Gatherer(object):
                 )
             return
 
+        if getattr(self.options, "serve", None):
+            GathererDaemon(self, self.options.serve, self.options.idle_timeout).run()
+            return
+
         if not self.options.infile:
             self.log.error("Input file was not specified")
             return
 
+        if getattr(self.options, "socket", None):
+            self._run_client()
+            return
+
         self.log.warning("Scanning began")
         try:
             self._run()
@@ -235,6 +933,72 @@ class Gatherer(object):
             raise
         self.log.warning("Scanning finished")
 
+    def _get_module_names(self):
+        """
+        Return the names of the modules in the modules directory.
+
+        :return: Sorted list of module names.
+        """
+
+        if self._module_names is None:
+            mod_path = os.path.dirname(
+                __import__(
+                    "gatherer.modules", globals(), locals(), ["WorkerInterface"], 0
+                ).__file__
+            )
+            self.log.info("module path: %s", mod_path)
+            self._module_names = sorted(
+                item.split(".")[0]
+                for item in os.listdir(mod_path)
+                if item.endswith(".py") and not item.startswith("__init__")
+            )
+        return self._module_names
+
+    @staticmethod
+    def _module_available(module_name):
+        """
+        Check the manifest requirements of a module without importing them.
+
+        :param module_name: Name of the module.
+        :return: True, if all required packages are installed.
+        """
+
+        for requirement in MANIFEST.get(module_name, {}).get("requires", []):
+            try:
+                # Submodules import their parent package, which may be missing.
+                if importlib.util.find_spec(requirement) is None:
+                    return False
+            except ModuleNotFoundError:
+                return False
+        return True
+
+    def _get_module(self, module_name):
+        """
+        Return the instance of a module, importing it on first use.
+
+        :param module_name: Name of the module.
+        :return: Module instance or None, if the module is not usable.
+        """
+
+        if module_name not in self.modules and module_name not in self._unavailable:
+            if module_name not in self._get_module_names():
+                self._unavailable.add(module_name)
+            elif not self._module_available(module_name):
+                self.log.error(
+                    'Module "%s" misses required packages: %s',
+                    module_name,
+                    ", ".join(MANIFEST[module_name]["requires"]),
+                )
+                self._unavailable.add(module_name)
+            else:
+                try:
+                    self._load_module(module_name)
+                except ImportError as ex:
+                    self.log.error('Module "%s" was not loaded: %s', module_name, ex)
+                if module_name not in self.modules:
+                    self._unavailable.add(module_name)
+        return self.modules.get(module_name)
+
     def _load_modules(self):
         """
         Load available modules for the gatherer.
@@ -243,46 +1007,46 @@ class Gatherer(object):
         :return: void
         """
 
-        mod_path = os.path.dirname(
-            __import__(
-                "gatherer.modules", globals(), locals(), ["WorkerInterface"], 0
-            ).__file__
-        )
-        self.log.info("module path: %s", mod_path)
-        for module_name in [
-            item.split(".")[0]
-            for item in os.listdir(mod_path)
-            if item.endswith(".py") and not item.startswith("__init__")
-        ]:
-            try:
-                self.log.debug('Loading module "%s"', module_name)
-                mod = __import__(
-                    f"gatherer.modules.{module_name}",
-                    globals(),
-                    locals(),
-                    ["WorkerInterface"],
-                    0,
+        for module_name in self._get_module_names():
+            if module_name not in self.modules:
+                self._load_module(module_name)
+
+    def _load_module(self, module_name):
+        """
+        Import a single module and register its instance.
+        If module meets the description, but cannot be imported, the ImportError exception is raised.
+
+        :param module_name: Name of the module.
+        :return: void
+        """
+
+        try:
+            self.log.debug('Loading module "%s"', module_name)
+            mod = __import__(
+                f"gatherer.modules.{module_name}",
+                globals(),
+                locals(),
+                ["WorkerInterface"],
+                0,
+            )
+            self.log.debug("Introspection: %s", dir(mod))
+            class_ = getattr(mod, module_name)
+            if not issubclass(class_, WorkerInterface):
+                self.log.error(
+                    'Module "%s" is not a gatherer module, skipping.', module_name
                 )
-                self.log.debug("Introspection: %s", dir(mod))
-                class_ = getattr(mod, module_name)
-                if not issubclass(class_, WorkerInterface):
-                    self.log.error(
-                        'Module "%s" is not a gatherer module, skipping.', module_name
-                    )
-                    continue
-                instance = class_()
-                if not instance.valid():
-                    self.log.error(
-                        'Module "%s" is broken, import aborted.', module_name
-                    )
-                    continue
-                self.modules[module_name] = instance
-            except (TypeError, AttributeError, NotImplementedError) as ex:
-                self.log.error('Module "%s" is broken, skipping.', module_name)
-                self.log.debug("Exception: %s", ex)
-            except ImportError:
-                self.log.debug('Module "%s" was not loaded.', module_name)
-                raise
+                return
+            instance = class_()
+            if not instance.valid():
+                self.log.error('Module "%s" is broken, import aborted.', module_name)
+                return
+            self.modules[module_name] = instance
+        except (TypeError, AttributeError, NotImplementedError) as ex:
+            self.log.error('Module "%s" is broken, skipping.', module_name)
+            self.log.debug("Exception: %s", ex)
+        except ImportError:
+            self.log.debug('Module "%s" was not loaded.', module_name)
+            raise
 
     def _remove_passwords(self, indict):
         """
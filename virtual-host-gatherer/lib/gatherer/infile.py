@@ -0,0 +1,113 @@
+# SPDX-FileCopyrightText: 2015-2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2015--2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Incremental reader for the gatherer input file.
+"""
+
+from __future__ import absolute_import
+import json
+
+_CHUNK_SIZE = 0x10000
+_WHITESPACE = " \t\n\r"
+
+
+def iter_nodes(stream, chunk_size=_CHUNK_SIZE):
+    """
+    Yield the node definitions of an input stream one at a time.
+
+    The stream may contain a JSON array of node definitions or one node
+    definition per line (NDJSON). Only the node being decoded is kept in
+    memory, so scanning can start before the whole input is read.
+
+    :param stream: Text stream to read from.
+    :param chunk_size: Maximum number of characters to read at once.
+    :return: Generator of node definition dictionaries.
+    """
+
+    decoder = json.JSONDecoder()
+    state = {"buf": "", "pos": 0}
+
+    def more():
+        # readline() returns as soon as a line is complete, so nodes arriving
+        # through a pipe are decoded without waiting for a full chunk.
+        chunk = stream.readline(chunk_size)
+        if not chunk:
+            return False
+        state["buf"] = state["buf"][state["pos"] :] + chunk
+        state["pos"] = 0
+        return True
+
+    def decode():
+        # A failed attempt costs as much as decoding the whole buffer, so
+        # only retry once the buffered input doubled. This keeps nodes that
+        # span many chunks linear instead of decoding them once per chunk.
+        pieces = [state["buf"][state["pos"] :]]
+        size = len(pieces[0])
+        tried = 0
+        while True:
+            if size >= 2 * tried:
+                text = "".join(pieces)
+                pieces = [text]
+                try:
+                    node, end = decoder.raw_decode(text)
+                except ValueError:
+                    tried = size
+                else:
+                    # A number may continue in the next chunk.
+                    if end < len(text) or isinstance(node, (dict, list, str)):
+                        state["buf"], state["pos"] = text, end
+                        return node
+            chunk = stream.readline(chunk_size)
+            if not chunk:
+                text = "".join(pieces)
+                node, end = decoder.raw_decode(text)
+                state["buf"], state["pos"] = text, end
+                return node
+            pieces.append(chunk)
+            size += len(chunk)
+
+    def skip(chars):
+        while True:
+            buf, pos = state["buf"], state["pos"]
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buf):
+                return True
+            if not more():
+                return False
+
+    if not skip(_WHITESPACE):
+        return
+    array = state["buf"][state["pos"]] == "["
+    if array:
+        state["pos"] += 1
+    separators = _WHITESPACE + "," if array else _WHITESPACE
+
+    while True:
+        if not skip(separators):
+            if array:
+                raise ValueError("Unterminated JSON array in the input file")
+            return
+        if array and state["buf"][state["pos"]] == "]":
+            return
+        node = decode()
+        if node is None:
+            raise ValueError("Unexpected null node in the input file")
+        yield node
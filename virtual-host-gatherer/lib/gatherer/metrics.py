@@ -0,0 +1,188 @@
+# SPDX-FileCopyrightText: 2015-2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Copyright (c) 2015--2025 SUSE LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Timing and size metrics of a gatherer run.
+"""
+
+from __future__ import absolute_import
+import json
+import os
+import tempfile
+import threading
+import time
+
+_PROM_PREFIX = "virtual_host_gatherer"
+
+_PROM_NODE_METRICS = [
+    ("scan_seconds", "seconds", "Total time spent scanning the node."),
+    ("hosts", "hosts", "Number of hosts reported for the node."),
+    ("vms", "vms", "Number of VMs reported for the node."),
+    ("result_bytes", "bytes", "Size of the JSON encoded node result."),
+    ("cached", "cached", "1 if the node result was served from the cache."),
+    ("success", "success", "1 if the node was scanned successfully."),
+    ("timed_out", "timed_out", "1 if the scan exceeded its deadline."),
+]
+
+
+class ScanMetrics(object):
+    """
+    Collect per-node metrics of a scan.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+        """
+
+        self.started = time.time()
+        self.nodes = list()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        node_id,
+        modname,
+        result,
+        seconds,
+        phases=None,
+        cached=False,
+        timed_out=False,
+    ):
+        """
+        Record the metrics of a scanned node.
+
+        :param node_id: Id of the node in the output.
+        :param modname: Name of the module.
+        :param result: Result of the worker.
+        :param seconds: Total time spent on the node.
+        :param phases: Dictionary of seconds by phase name.
+        :param cached: True, if the result was served from the cache.
+        :param timed_out: True, if the scan exceeded --timeout or --scan-budget.
+        :return: void
+        """
+
+        hosts = result if isinstance(result, dict) else dict()
+        vms = sum(
+            len(host.get("vms") or dict())
+            for host in hosts.values()
+            if isinstance(host, dict)
+        )
+        entry = {
+            "id": node_id,
+            "module": modname,
+            "seconds": seconds,
+            "phases": phases or dict(),
+            "hosts": len(hosts),
+            "vms": vms,
+            "bytes": len(json.dumps(result).encode("utf-8")),
+            "cached": cached,
+            "success": result is not None,
+            "timed_out": timed_out,
+        }
+        with self._lock:
+            self.nodes.append(entry)
+
+    def as_dict(self):
+        """
+        Return all metrics as a dictionary.
+        """
+
+        return {
+            "started": self.started,
+            "seconds": time.time() - self.started,
+            "nodes": self.nodes,
+        }
+
+    def write_json(self, path):
+        """
+        Write the metrics as JSON document.
+
+        :param path: Path of the metrics file.
+        :return: void
+        """
+
+        _write_atomic(path, json.dumps(self.as_dict(), indent=4, sort_keys=True))
+
+    def write_prometheus(self, path):
+        """
+        Write the metrics in the format of the Prometheus textfile collector.
+
+        :param path: Path of the metrics file, usually ending with ".prom".
+        :return: void
+        """
+
+        lines = list()
+        phase_metric = f"{_PROM_PREFIX}_node_phase_seconds"
+        lines.append(f"# HELP {phase_metric} Time spent in a phase of the node scan.")
+        lines.append(f"# TYPE {phase_metric} gauge")
+        for entry in self.nodes:
+            for phase, seconds in sorted(entry["phases"].items()):
+                labels = _labels(node=entry["id"], module=entry["module"], phase=phase)
+                lines.append(f"{phase_metric}{{{labels}}} {seconds}")
+
+        for name, key, description in _PROM_NODE_METRICS:
+            metric = f"{_PROM_PREFIX}_node_{name}"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} gauge")
+            for entry in self.nodes:
+                labels = _labels(node=entry["id"], module=entry["module"])
+                value = entry[key]
+                if isinstance(value, bool):
+                    value = int(value)
+                lines.append(f"{metric}{{{labels}}} {value}")
+
+        metric = f"{_PROM_PREFIX}_last_run_seconds"
+        lines.append(f"# HELP {metric} Duration of the last gatherer run.")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {time.time() - self.started}")
+        metric = f"{_PROM_PREFIX}_last_run_timestamp_seconds"
+        lines.append(f"# HELP {metric} Start time of the last gatherer run.")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {self.started}")
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _labels(**labels):
+    """
+    Format Prometheus labels, escaping the values.
+    """
+
+    escaped = list()
+    for key, value in sorted(labels.items()):
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        escaped.append(f'{key}="{value}"')
+    return ",".join(escaped)
+
+
+def _write_atomic(path, content):
+    """
+    Write a file so that readers never see it half written.
+    """
+
+    handle, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    with os.fdopen(handle, "w", encoding="utf-8") as out:
+        out.write(content)
+    os.chmod(tmp_path, 0o644)
+    os.rename(tmp_path, path)
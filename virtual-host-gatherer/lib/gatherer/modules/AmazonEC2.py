@@ -23,12 +23,13 @@ Amazon EC2 Worker module implementation.
 
 from __future__ import print_function, absolute_import, division
 import logging
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+from gatherer.modules import WorkerInterface, MANIFEST
 
 try:
     from libcloud.compute.types import Provider
     from libcloud.compute.providers import get_driver
+    from libcloud.compute.drivers.ec2 import NAMESPACE
+    from libcloud.utils.xml import findall, findtext
 
     IS_VALID = True
 except ImportError as ex:
@@ -40,9 +41,9 @@ class AmazonEC2(WorkerInterface):
     Worker class for the Amazon EC2 Public Cloud.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [("access_key_id", ""), ("secret_access_key", ""), ("region", ""), ("zone", "")]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["AmazonEC2"]["parameters"]
+    # Instances per DescribeInstances call, 5 to 1000
+    PAGE_SIZE = 1000
 
     # pylint: disable-next=super-init-not-called
     def __init__(self):
@@ -54,6 +55,7 @@ class AmazonEC2(WorkerInterface):
 
         self.log = logging.getLogger(__name__)
         self.access_key_id = self.secret_access_key = self.region = self.zone = None
+        self.page_size = self.PAGE_SIZE
 
     # pylint: disable=R0801
     def set_node(self, node):
@@ -75,6 +77,7 @@ class AmazonEC2(WorkerInterface):
         self.region = node["region"]
         self.zone = node["zone"]
         self.node_id = node["id"]
+        self.page_size = int(node.get("page_size") or self.PAGE_SIZE)
 
     def parameters(self):
         """
@@ -93,8 +96,11 @@ class AmazonEC2(WorkerInterface):
         """
         self.log.info("Connect Amazon EC2 Public Cloud")
         try:
-            cls = get_driver(Provider.EC2)
-            driver = cls(self.access_key_id, self.secret_access_key, region=self.region)
+            with self.phase("connect"):
+                cls = get_driver(Provider.EC2)
+                driver = cls(
+                    self.access_key_id, self.secret_access_key, region=self.region
+                )
         except Exception as ex:  # pylint: disable=broad-exception-caught
             self.log.error(ex)
             driver = None
@@ -121,22 +127,88 @@ class AmazonEC2(WorkerInterface):
             "optionalVmData": {},
         }
 
-        skipped_regions = set()
-        for node in driver.list_nodes():
-            if node.extra["availability"] == self.zone:
-                output[self.node_id]["vms"][node.name] = node.id
-                output[self.node_id]["optionalVmData"][node.name] = {}
-                output[self.node_id]["optionalVmData"][node.name]["vmState"] = str(
-                    node.state
-                )
-            else:
-                skipped_regions.add(node.extra["availability"])
+        for nodes in self._list_nodes(driver):
+            with self.phase("transform"):
+                for node in nodes:
+                    output[self.node_id]["vms"][node.name] = node.id
+                    output[self.node_id]["optionalVmData"][node.name] = {}
+                    output[self.node_id]["optionalVmData"][node.name]["vmState"] = str(
+                        node.state
+                    )
 
-        if skipped_regions:
-            self.log.info("Found nodes in other regions than %s", self.zone)
-            self.log.info("Skipped regions: %s", skipped_regions)
         return output
 
+    def _list_nodes(self, driver):
+        """
+        List the instances of the zone page by page.
+
+        The zone is filtered by the DescribeInstances call. Unlike
+        driver.list_nodes() the pages are followed by their NextToken and the
+        elastic IPs, which are not reported, are not looked up.
+
+        :param driver: EC2 node driver.
+        :return: Generator of lists of Node instances.
+        """
+
+        params = {
+            "Action": "DescribeInstances",
+            "MaxResults": str(self.page_size),
+            "Filter.1.Name": "availability-zone",
+            "Filter.1.Value.1": self.zone,
+        }
+        calls = received = 0
+        while True:
+            with self.phase("fetch"):
+                response = driver.connection.request(driver.path, params=params)
+            calls += 1
+            body = response.body or b""
+            if not isinstance(body, bytes):
+                body = body.encode("utf-8")
+            received += len(body)
+            del body
+            with self.phase("transform"):
+                nodes = list()
+                for reservation in findall(
+                    element=response.object,
+                    xpath="reservationSet/item",
+                    namespace=NAMESPACE,
+                ):
+                    # _to_nodes() is private, the package pins the libcloud
+                    # releases providing it.
+                    # pylint: disable-next=protected-access
+                    nodes += driver._to_nodes(reservation, "instancesSet/item")
+                token = findtext(
+                    element=response.object, xpath="nextToken", namespace=NAMESPACE
+                )
+            del response
+            yield nodes
+            if not token:
+                break
+            params["NextToken"] = token
+        self.log.info(
+            "Listed the instances of %s with %d DescribeInstances calls, %d bytes",
+            self.zone,
+            calls,
+            received,
+        )
+
+    def _validate_parameters(self, node):
+        """
+        Validate parameters.
+
+        :param node: Dictionary with the node description.
+        :return:
+        """
+
+        super()._validate_parameters(node)
+        try:
+            if node.get("page_size") and not 5 <= int(node["page_size"]) <= 1000:
+                raise ValueError(node["page_size"])
+        except ValueError as exc:
+            raise AttributeError(
+                f"Invalid page_size '{node['page_size']}', allowed are 5 to 1000"
+            ) from exc
+
     def valid(self):
         """
         Check plugin class validity.
@@ -23,8 +23,7 @@ Azure Cloud Worker module implementation.
 
 from __future__ import print_function, absolute_import, division
 import logging
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+from gatherer.modules import WorkerInterface, MANIFEST
 
 try:
     from libcloud.compute.types import Provider
@@ -40,15 +39,7 @@ class Azure(WorkerInterface):
     Worker class for the Azure Public Cloud.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [
-            ("subscription_id", ""),
-            ("application_id", ""),
-            ("tenant_id", ""),
-            ("secret_key", ""),
-            ("zone", ""),
-        ]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["Azure"]["parameters"]
 
     # pylint: disable-next=super-init-not-called
     def __init__(self):
@@ -102,13 +93,14 @@ class Azure(WorkerInterface):
         """
         self.log.info("Connect Azure Public Cloud")
         try:
-            cls = get_driver(Provider.AZURE_ARM)
-            driver = cls(
-                tenant_id=self.tenant_id,
-                subscription_id=self.subscription_id,
-                key=self.application_id,
-                secret=self.secret_key,
-            )
+            with self.phase("connect"):
+                cls = get_driver(Provider.AZURE_ARM)
+                driver = cls(
+                    tenant_id=self.tenant_id,
+                    subscription_id=self.subscription_id,
+                    key=self.application_id,
+                    secret=self.secret_key,
+                )
         except Exception as ex:  # pylint: disable=broad-exception-caught
             self.log.error(ex)
             driver = None
@@ -135,18 +127,22 @@ class Azure(WorkerInterface):
             "optionalVmData": {},
         }
 
-        skipped_regions = set()
-        for node in driver.list_nodes():
-            if node.extra["location"] == self.zone:
-                output[self.node_id]["vms"][node.name] = node.extra["properties"][
-                    "vmId"
-                ]
-                output[self.node_id]["optionalVmData"][node.name] = {}
-                output[self.node_id]["optionalVmData"][node.name]["vmState"] = str(
-                    node.state
-                )
-            else:
-                skipped_regions.add(node.extra["location"])
+        with self.phase("fetch"):
+            nodes = driver.list_nodes()
+
+        with self.phase("transform"):
+            skipped_regions = set()
+            for node in nodes:
+                if node.extra["location"] == self.zone:
+                    output[self.node_id]["vms"][node.name] = node.extra["properties"][
+                        "vmId"
+                    ]
+                    output[self.node_id]["optionalVmData"][node.name] = {}
+                    output[self.node_id]["optionalVmData"][node.name]["vmState"] = str(
+                        node.state
+                    )
+                else:
+                    skipped_regions.add(node.extra["location"])
 
         if skipped_regions:
             self.log.info("Found nodes in other regions than %s", self.zone)
@@ -25,8 +25,7 @@ File Worker module implementation.
 
 from __future__ import print_function, absolute_import, division
 import logging
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+from gatherer.modules import WorkerInterface, MANIFEST
 import json
 import pycurl
 
@@ -61,7 +60,7 @@ class File(WorkerInterface):
     Worker class for the VMWare.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict([("url", "")])
+    DEFAULT_PARAMETERS = MANIFEST["File"]["parameters"]
 
     # pylint: disable-next=super-init-not-called
     def __init__(self):
@@ -111,7 +110,10 @@ class File(WorkerInterface):
         if not urlparse.urlsplit(self.url).scheme:
             self.url = f"file://{self.url}"
         try:
-            output = json.loads(_urlopen(str(self.url), timeout=300))
+            with self.phase("fetch"):
+                data = _urlopen(str(self.url), timeout=300)
+            with self.phase("transform"):
+                output = json.loads(data)
         except Exception as exc:  # pylint: disable=broad-exception-caught
             self.log.error("Unable to fetch '%s': %s", str(self.url), exc)
             return None
@@ -22,8 +22,7 @@ Google Compute Engine Worker module implementation.
 
 from __future__ import print_function, absolute_import, division
 import logging
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+from gatherer.modules import WorkerInterface, MANIFEST
 
 try:
     from libcloud.compute.types import Provider
@@ -39,14 +38,7 @@ class GoogleCE(WorkerInterface):
     Worker class for the Google Compute Engine Public Cloud.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [
-            ("service_account_email", ""),
-            ("cert_path", ""),
-            ("project_id", ""),
-            ("zone", ""),
-        ]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["GoogleCE"]["parameters"]
 
     # pylint: disable-next=super-init-not-called
     def __init__(self):
@@ -97,13 +89,14 @@ class GoogleCE(WorkerInterface):
         """
         self.log.info("Connect Google Compute Engine Public Cloud")
         try:
-            cls = get_driver(Provider.GCE)
-            driver = cls(
-                self.service_account_email,
-                self.cert_path,
-                datacenter=self.zone,
-                project=self.project_id,
-            )
+            with self.phase("connect"):
+                cls = get_driver(Provider.GCE)
+                driver = cls(
+                    self.service_account_email,
+                    self.cert_path,
+                    datacenter=self.zone,
+                    project=self.project_id,
+                )
         except Exception as ex:  # pylint: disable=broad-exception-caught
             self.log.error(ex)
             driver = None
@@ -130,16 +123,20 @@ class GoogleCE(WorkerInterface):
             "optionalVmData": {},
         }
 
-        skipped_regions = set()
-        for node in driver.list_nodes():
-            if node.extra["zone"].name == self.zone:
-                output[self.node_id]["vms"][node.name] = node.id
-                output[self.node_id]["optionalVmData"][node.name] = {}
-                output[self.node_id]["optionalVmData"][node.name]["vmState"] = str(
-                    node.state
-                )
-            else:
-                skipped_regions.add(node.extra["zone"].name)
+        with self.phase("fetch"):
+            nodes = driver.list_nodes()
+
+        with self.phase("transform"):
+            skipped_regions = set()
+            for node in nodes:
+                if node.extra["zone"].name == self.zone:
+                    output[self.node_id]["vms"][node.name] = node.id
+                    output[self.node_id]["optionalVmData"][node.name] = {}
+                    output[self.node_id]["optionalVmData"][node.name]["vmState"] = str(
+                        node.state
+                    )
+                else:
+                    skipped_regions.add(node.extra["zone"].name)
 
         if skipped_regions:
             self.log.info("Found nodes in other regions than %s", self.zone)
@@ -24,14 +24,17 @@ Kubernetes Worker module implementation.
 """
 
 from __future__ import print_function, absolute_import, division
+import json
 import logging
 import re
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from gatherer.modules import WorkerInterface, MANIFEST
 
 try:
     import kubernetes  # pylint: disable=import-self
     import kubernetes.client
+    import kubernetes.watch
     from kubernetes.client.rest import ApiException
     from urllib3.exceptions import HTTPError
 
@@ -45,7 +48,13 @@ class Kubernetes(WorkerInterface):
     Worker class for the Kubernetes.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict([("kubeconfig", ""), ("context", "")])
+    DEFAULT_PARAMETERS = MANIFEST["Kubernetes"]["parameters"]
+    PAGE_SIZE = 500
+    # Seconds after which the API server ends a watch request, it is resumed
+    # from the last resourceVersion.
+    WATCH_TIMEOUT = 300
+    # Maximum number of contexts scanned at the same time
+    PARALLEL = 16
 
     # pylint: disable-next=super-init-not-called
     def __init__(self):
@@ -56,7 +65,15 @@ class Kubernetes(WorkerInterface):
         """
 
         self.log = logging.getLogger(__name__)
-        self.kubeconfig = self.context = None
+        self.kubeconfig = self.context = self.contexts = None
+        self.page_size = self.PAGE_SIZE
+        self._api_client = None
+        # context -> Kubernetes worker kept by a persistent worker
+        self._members = dict()
+        # Node watch of a persistent worker
+        self._lock = threading.Lock()
+        self._nodes = None
+        self._watch = self._watch_thread = self._watch_stopped = None
 
     # pylint: disable=R0801
     def set_node(self, node):
@@ -75,6 +92,8 @@ class Kubernetes(WorkerInterface):
 
         self.kubeconfig = node.get("kubeconfig")
         self.context = node.get("context")
+        self.contexts = self._split(node.get("contexts")) or None
+        self.page_size = int(node.get("page_size") or self.PAGE_SIZE)
 
     def parameters(self):
         """
@@ -89,47 +108,55 @@ class Kubernetes(WorkerInterface):
         """
         Start worker.
 
+        The nodes are listed in pages of page_size. The responses are parsed
+        as plain JSON instead of being deserialized into the client models,
+        only the emitted fields are read. A persistent worker
+        then watches the nodes from the resourceVersion of the list, later
+        runs return the node map kept current by the watch.
+
+        With contexts every context is scanned by a worker with its own API
+        client at the same time, the hosts are keyed by "context/node name".
+
         :return: Dictionary of the hosts in the worker scope.
         """
 
+        if self.contexts:
+            return self._run_contexts()
+
+        if self._watching():
+            with self.phase("transform"), self._lock:
+                return dict(self._nodes)
+
         output = dict()
-        self._setup_connection()
+        if self._api_client is None:
+            with self.phase("connect"):
+                self._setup_connection()
         try:
-            api_instance = kubernetes.client.CoreV1Api()
-            api_response = api_instance.list_node()
-
-            for node in api_response.items:
-                cpu = node.status.capacity.get("cpu")
-                memory = 0
-                reg = re.compile(r"^(\d+)(\w+)$")
-                if reg.match(node.status.capacity.get("memory")):
-                    memory, unit = reg.match(
-                        node.status.capacity.get("memory")
-                    ).groups()
-                    if unit == "Ki":
-                        memory = int(memory) / 1024
-                    if unit == "Gi":
-                        memory = int(memory) * 1024
-                arch = node.status.node_info.architecture
-                if arch.lower() == "amd64":
-                    arch = "x86_64"
-
-                output[node.metadata.name] = {
-                    "type": "kubernetes",
-                    "cpuArch": arch,
-                    "cpuDescription": "(unknown)",
-                    "cpuMhz": cpu,
-                    "cpuVendor": "(unknown)",
-                    "hostIdentifier": node.status.node_info.machine_id,
-                    "name": node.metadata.name,
-                    "os": node.status.node_info.os_image,
-                    "osVersion": 1,
-                    "ramMb": int(memory),
-                    "totalCpuCores": cpu,
-                    "totalCpuSockets": cpu,
-                    "totalCpuThreads": 1,
-                    "vms": {},
-                }
+            api_instance = kubernetes.client.CoreV1Api(self._api_client)
+            continue_token = None
+            while True:
+                with self.phase("fetch"):
+                    response = api_instance.list_node(
+                        limit=self.page_size,
+                        _continue=continue_token,
+                        _preload_content=False,
+                    )
+                    try:
+                        data = response.data
+                    finally:
+                        response.release_conn()
+                with self.phase("transform"):
+                    node_list = json.loads(data)
+                    del data
+                    for node in node_list["items"]:
+                        output[node["metadata"]["name"]] = self._node_record(node)
+                metadata = node_list["metadata"]
+                del node_list
+                continue_token = metadata.get("continue")
+                if not continue_token:
+                    break
+            if self.persistent:
+                self._start_watch(api_instance, metadata.get("resourceVersion"), output)
 
         except (ApiException, HTTPError) as exc:
             if isinstance(exc, ApiException) and exc.status == 404:
@@ -141,8 +168,254 @@ class Kubernetes(WorkerInterface):
                 )
                 output = None
 
+        finally:
+            if not self.persistent:
+                self.close()
+
+        return output
+
+    def _run_contexts(self):
+        """
+        Scan the nodes of several contexts of the kubeconfig concurrently.
+
+        :return: Dictionary of the hosts of all contexts or None, if all failed.
+        """
+
+        try:
+            contexts = self._context_names()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.error(
+                "Unable to read the contexts of %s: %s", self.kubeconfig, exc
+            )
+            return None
+        if not contexts:
+            self.log.error("No contexts found in %s", self.kubeconfig)
+            return None
+
+        with self.phase("fetch"):
+            with ThreadPoolExecutor(
+                max_workers=min(len(contexts), self.PARALLEL)
+            ) as executor:
+                results = list(executor.map(self._scan_context, contexts))
+
+        output = dict()
+        failed = 0
+        for context, result in zip(contexts, results):
+            if result is None:
+                failed += 1
+                continue
+            for name, host in result.items():
+                output[f"{context}/{name}"] = host
+        if failed:
+            self.log.error("%d of %d contexts failed", failed, len(contexts))
+            self.mark_failed()
+            if failed == len(contexts):
+                return None
         return output
 
+    def _context_names(self):
+        """
+        Return the names of the contexts to scan, "*" selects all contexts
+        of the kubeconfig.
+
+        :return: List of context names.
+        """
+
+        if "*" not in self.contexts:
+            return list(dict.fromkeys(self.contexts))
+        contexts, _ = kubernetes.config.list_kube_config_contexts(
+            config_file=self.kubeconfig
+        )
+        return [context["name"] for context in contexts]
+
+    def _scan_context(self, context):
+        """
+        Scan the nodes of a context.
+
+        :param context: Name of the context.
+        :return: Dictionary of the hosts or None on failure.
+        """
+
+        member = self._members.get(context)
+        if member is None:
+            member = Kubernetes()
+            member.set_node(
+                dict(
+                    kubeconfig=self.kubeconfig,
+                    context=context,
+                    page_size=self.page_size,
+                )
+            )
+            member.persistent = self.persistent
+            if self.persistent:
+                self._members[context] = member
+        try:
+            return member.run()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.error("Scanning context %s failed: %s", context, exc)
+            return None
+
+    @staticmethod
+    def _split(value):
+        """
+        Return a list parameter given as list or as a comma or whitespace
+        separated string.
+        """
+
+        if not value:
+            return []
+        if isinstance(value, (list, tuple)):
+            return [str(item) for item in value if item]
+        return [item for item in re.split(r"[,\s]+", str(value)) if item]
+
+    @staticmethod
+    def _node_record(node):
+        """
+        Return the host record of a node.
+
+        :param node: Decoded JSON of a Node object.
+        :return: Dictionary of the host record.
+        """
+
+        status = node["status"]
+        node_info = status["nodeInfo"]
+        cpu = status["capacity"].get("cpu")
+        memory = 0
+        reg = re.compile(r"^(\d+)(\w+)$")
+        if reg.match(status["capacity"].get("memory")):
+            memory, unit = reg.match(status["capacity"].get("memory")).groups()
+            if unit == "Ki":
+                memory = int(memory) / 1024
+            if unit == "Gi":
+                memory = int(memory) * 1024
+        arch = node_info["architecture"]
+        if arch.lower() == "amd64":
+            arch = "x86_64"
+
+        return {
+            "type": "kubernetes",
+            "cpuArch": arch,
+            "cpuDescription": "(unknown)",
+            "cpuMhz": cpu,
+            "cpuVendor": "(unknown)",
+            "hostIdentifier": node_info["machineID"],
+            "name": node["metadata"]["name"],
+            "os": node_info["osImage"],
+            "osVersion": 1,
+            "ramMb": int(memory),
+            "totalCpuCores": cpu,
+            "totalCpuSockets": cpu,
+            "totalCpuThreads": 1,
+            "vms": {},
+        }
+
+    def _watching(self):
+        """
+        Return whether the node map is kept current by a running watch.
+        """
+
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+
+    def _start_watch(self, api_instance, resource_version, nodes):
+        """
+        Watch the nodes in a background thread from a list result on.
+
+        :param api_instance: CoreV1Api instance.
+        :param resource_version: resourceVersion of the node list.
+        :param nodes: Dictionary of the host records of the node list.
+        :return: void
+        """
+
+        self._stop_watch()
+        self._nodes = dict(nodes)
+        # The "object" return type keeps the events as plain JSON.
+        self._watch = kubernetes.watch.Watch(return_type="object")
+        self._watch_stopped = threading.Event()
+        self._watch_thread = threading.Thread(
+            target=self._run_watch,
+            args=(api_instance, resource_version, self._watch, self._watch_stopped),
+            name=f"kubernetes-watch-{self.context}",
+        )
+        self._watch_thread.daemon = True
+        self._watch_thread.start()
+
+    def _run_watch(self, api_instance, resource_version, watch, stopped):
+        """
+        Apply node events to the node map until stopped or the
+        resourceVersion expired.
+        """
+
+        while not stopped.is_set():
+            try:
+                for event in watch.stream(
+                    api_instance.list_node,
+                    resource_version=resource_version,
+                    allow_watch_bookmarks=True,
+                    timeout_seconds=self.WATCH_TIMEOUT,
+                ):
+                    if stopped.is_set():
+                        return
+                    self._apply_event(event["type"], event["object"])
+                resource_version = watch.resource_version or resource_version
+            except (ApiException, HTTPError) as exc:
+                if stopped.is_set():
+                    return
+                if isinstance(exc, ApiException) and exc.status == 410:
+                    # The next run lists the nodes again.
+                    self.log.info("Node watch expired: %s", exc.reason)
+                    return
+                self.log.warning("Node watch failed: %s", exc)
+                stopped.wait(1)
+
+    def _apply_event(self, event_type, node):
+        """
+        Apply a node watch event to the node map.
+
+        :param event_type: ADDED, MODIFIED, DELETED or BOOKMARK.
+        :param node: Decoded JSON of a Node object.
+        :return: void
+        """
+
+        if event_type not in ("ADDED", "MODIFIED", "DELETED"):
+            return
+        name = node["metadata"]["name"]
+        record = None if event_type == "DELETED" else self._node_record(node)
+        with self._lock:
+            if record is None:
+                self._nodes.pop(name, None)
+            elif self._nodes.get(name) != record:
+                self._nodes[name] = record
+            else:
+                # Status updates without a change of the host record.
+                return
+        self.log.debug("Node %s %s", name, event_type.lower())
+
+    def _stop_watch(self):
+        """
+        Stop the watch thread, if any.
+        """
+
+        if self._watch_thread is not None:
+            self._watch_stopped.set()
+            self._watch.stop()
+        self._watch_thread = self._watch = self._watch_stopped = None
+        self._nodes = None
+
+    def close(self):
+        """
+        Close the API client of the worker.
+
+        :return: void
+        """
+
+        members, self._members = self._members, dict()
+        for member in members.values():
+            member.close()
+        self._stop_watch()
+        api_client, self._api_client = self._api_client, None
+        if api_client is not None and hasattr(api_client, "close"):
+            api_client.close()
+
     def valid(self):
         """
         Check plugin class validity.
@@ -155,8 +428,11 @@ class Kubernetes(WorkerInterface):
     def _setup_connection(self):
         """
         Setup and configure connection to Kubernetes
+
+        The worker gets its own API client instead of changing the global
+        default configuration, so its connection pool can be kept between runs.
         """
-        kubernetes.config.load_kube_config(
+        self._api_client = kubernetes.config.new_client_from_config(
             config_file=self.kubeconfig, context=self.context
         )
 
@@ -168,7 +444,14 @@ class Kubernetes(WorkerInterface):
         :return:
         """
 
-        if not (node.get("kubeconfig") and node.get("context")):
+        if not (
+            node.get("kubeconfig") and (node.get("context") or node.get("contexts"))
+        ):
             raise AttributeError(
-                "Missing parameter 'kubeconfig' and 'context' in infile"
+                "Missing parameter 'kubeconfig' and 'context' or 'contexts' in infile"
             )
+        try:
+            if node.get("page_size") and int(node["page_size"]) < 1:
+                raise ValueError(node["page_size"])
+        except ValueError as exc:
+            raise AttributeError(f"Invalid page_size '{node['page_size']}'") from exc
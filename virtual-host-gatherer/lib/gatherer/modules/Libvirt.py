@@ -23,10 +23,11 @@ Libvirt Worker module implementation.
 """
 
 from __future__ import print_function, absolute_import, division
+import copy
 import logging
-from collections import OrderedDict
+import threading
 from xml.etree import ElementTree
-from gatherer.modules import WorkerInterface
+from gatherer.modules import WorkerInterface, MANIFEST
 from six.moves import urllib
 
 
@@ -37,17 +38,43 @@ try:
 except ImportError as ex:
     IS_VALID = False
 
+_EVENT_LOOP = None
+_EVENT_LOOP_LOCK = threading.Lock()
+
+
+def _start_event_loop():
+    """
+    Register the default libvirt event implementation and run it in a
+    background thread, once per process.
+
+    libvirt requires the event implementation to be registered before the
+    connections receiving events are opened.
+
+    :return: void
+    """
+
+    global _EVENT_LOOP  # pylint: disable=global-statement
+    with _EVENT_LOOP_LOCK:
+        if _EVENT_LOOP is not None:
+            return
+        libvirt.virEventRegisterDefaultImpl()
+
+        def run():
+            while True:
+                libvirt.virEventRunDefaultImpl()
+
+        _EVENT_LOOP = threading.Thread(target=run, name="libvirt-events")
+        _EVENT_LOOP.daemon = True
+        _EVENT_LOOP.start()
+
 
 class Libvirt(WorkerInterface):
     """
     Worker class for Libvirt.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [("uri", ""), ("sasl_username", None), ("sasl_password", None)]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["Libvirt"]["parameters"]
 
-    # pylint: disable-next=super-init-not-called
     def __init__(self):
         """
         Constructor.
@@ -60,6 +87,15 @@ class Libvirt(WorkerInterface):
         self.uri = None
         self.sasl_username = None
         self.sasl_password = None
+        self.vm_details = False
+        self.topology_cache = None
+        self.events = False
+        self._conn = None
+        # State of the event driven inventory of a persistent worker
+        self._callback_id = None
+        self._mapping = None
+        self._dirty = dict()
+        self._events_lock = threading.Lock()
 
         if self.valid():
             self.VMSTATE = {
@@ -97,6 +133,8 @@ class Libvirt(WorkerInterface):
 
         self.sasl_username = node.get("sasl_username")
         self.sasl_password = node.get("sasl_password")
+        self.vm_details = str(node.get("vm_details")).lower() in ("1", "true", "yes")
+        self.events = str(node.get("events")).lower() in ("1", "true", "yes")
 
     def parameters(self):
         """
@@ -113,17 +151,166 @@ class Libvirt(WorkerInterface):
         """
 
         self.log.info("Using libvirt uri %s", self.uri)
+        conn = None
         try:
-            conn = self.get_connection()
+            conn = self._connection()
             if conn:
-                output = self.get_host_guest_mapping(conn)
+                with self.phase("fetch"):
+                    if self._callback_id is not None:
+                        output = self.get_event_mapping(conn)
+                    else:
+                        output = self.get_host_guest_mapping(conn)
                 return output
         except libvirt.libvirtError as err:
             self.log.error(err)
         finally:
-            if conn:
+            if conn and not self.persistent:
                 conn.close()
 
+    def close(self):
+        """
+        Close the connection kept open by a persistent worker.
+
+        :return: void
+        """
+
+        conn, self._conn = self._conn, None
+        callback_id, self._callback_id = self._callback_id, None
+        self._mapping = None
+        if conn is not None:
+            try:
+                if callback_id is not None:
+                    conn.domainEventDeregisterAny(callback_id)
+                conn.close()
+            except libvirt.libvirtError as err:
+                self.log.debug(err)
+
+    def _connection(self):
+        """
+        Open a connection or reuse the one of a persistent worker.
+
+        :return: a :py:class:`virConnect` instance or None.
+        """
+
+        if self._conn is not None:
+            try:
+                if self._conn.isAlive():
+                    return self._conn
+            except libvirt.libvirtError as err:
+                self.log.debug(err)
+            self.log.info("Connection to %s lost, reconnecting", self.uri)
+            self.close()
+
+        use_events = self.events and self.persistent
+        with self.phase("connect"):
+            if use_events:
+                _start_event_loop()
+            conn = self.get_connection()
+        if self.persistent:
+            self._conn = conn
+        if conn is not None and use_events:
+            self._register_events(conn)
+        return conn
+
+    def _register_events(self, conn):
+        """
+        Register the domain lifecycle callback on a new connection.
+
+        The first scan on the connection walks all domains, later scans only
+        refresh the domains reported by an event.
+
+        :param conn: a :py:class:`virConnect` instance
+        :return: void
+        """
+
+        with self._events_lock:
+            self._mapping = None
+            self._dirty.clear()
+        try:
+            self._callback_id = conn.domainEventRegisterAny(
+                None,
+                libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE,
+                self._lifecycle_event,
+                None,
+            )
+        except libvirt.libvirtError as err:
+            self.log.warning("Domain events not available on %s: %s", self.uri, err)
+            self._callback_id = None
+
+    # pylint: disable-next=unused-argument,too-many-arguments
+    def _lifecycle_event(self, conn, domain, event, detail, opaque):
+        """
+        Remember a domain changed by a lifecycle event.
+
+        Called in the thread of the libvirt event loop.
+        """
+
+        with self._events_lock:
+            self._dirty[domain.UUIDString()] = event
+
+    def get_event_mapping(self, conn):
+        """
+        Return the host/guest mapping kept current by the lifecycle events.
+
+        All domains are walked on the first scan of a connection, afterwards
+        only the domains reported by an event are looked up again.
+
+        :param conn: a :py:class:`virConnect` instance
+        :return: Dictionary with host/guest info
+        """
+
+        with self._events_lock:
+            mapping = self._mapping
+            dirty, self._dirty = self._dirty, dict()
+        if mapping is None:
+            # Events arriving during the walk are applied on the next scan.
+            mapping = self.get_host_guest_mapping(conn)
+            if mapping and not self.failed():
+                self._mapping = mapping
+            return copy.deepcopy(mapping)
+
+        for host in mapping.values():
+            for uuid, event in dirty.items():
+                self._refresh_domain(conn, host, uuid, event)
+        self.log.info("Refreshed %d domains from events", len(dirty))
+        return copy.deepcopy(mapping)
+
+    def _refresh_domain(self, conn, host, uuid, event):
+        """
+        Update a domain of the host mapping after a lifecycle event.
+
+        A domain which cannot be looked up for another reason than being
+        gone keeps its entry and is looked up again on the next scan.
+
+        :param conn: a :py:class:`virConnect` instance
+        :param host: Host entry of the mapping.
+        :param uuid: UUID of the domain.
+        :param event: Last lifecycle event of the domain.
+        :return: void
+        """
+
+        domain = None
+        if event != libvirt.VIR_DOMAIN_EVENT_UNDEFINED:
+            try:
+                domain = self.get_domain(conn.lookupByUUIDString(uuid))
+            except libvirt.libvirtError as err:
+                if err.get_error_code() != libvirt.VIR_ERR_NO_DOMAIN:
+                    self.log.warning("Unable to refresh domain %s: %s", uuid, err)
+                    self.mark_failed()
+                    with self._events_lock:
+                        self._dirty.setdefault(uuid, event)
+                    return
+                # Transient domains are gone after they stopped.
+                self.log.debug("Domain %s not found: %s", uuid, err)
+
+        for name in [name for name, value in host["vms"].items() if value == uuid]:
+            del host["vms"][name]
+            host["optionalVmData"].pop(name, None)
+        if domain is not None:
+            name, uuid, vm_data = domain
+            host["vms"][name] = uuid
+            host["optionalVmData"][name] = vm_data
+
     def valid(self):
         """
         Check plugin class validity.
@@ -144,7 +331,18 @@ class Libvirt(WorkerInterface):
         if not node.get("uri"):
             raise AttributeError("Missing uri parameter in infile")
 
-        splitted_url = urllib.parse.urlsplit(node.get("uri"))
+        self.validate_uri(node.get("uri"))
+
+    @staticmethod
+    def validate_uri(uri):
+        """
+        Validate a libvirt connection URI.
+
+        :param uri: Connection URI.
+        :return:
+        """
+
+        splitted_url = urllib.parse.urlsplit(uri)
 
         if not splitted_url.scheme:
             raise AttributeError(
@@ -203,6 +401,29 @@ class Libvirt(WorkerInterface):
 
         return capabilities_xml.find("host/cpu/topology")
 
+    @classmethod
+    def get_host_topology(cls, capabilities_xml):
+        """
+        Get the host fields taken from the capabilities
+
+        :param capabilities_xml: xml representation of the virConnectGetCapabilities
+        :return: Dictionary with the host identifier and cpu fields
+        """
+
+        host_cpu_topology = cls.get_host_cpu_topology(capabilities_xml)
+        totalCpuSockets = int(host_cpu_topology.get("sockets"))
+        totalCpuCores = int(host_cpu_topology.get("cores")) * totalCpuSockets
+        totalCpuThreads = int(host_cpu_topology.get("threads")) * totalCpuCores
+        return {
+            "hostIdentifier": capabilities_xml.find("host/uuid").text,
+            "totalCpuSockets": totalCpuSockets,
+            "totalCpuCores": totalCpuCores,
+            "totalCpuThreads": totalCpuThreads,
+            "cpuVendor": capabilities_xml.find("host/cpu/vendor").text,
+            "cpuDescription": capabilities_xml.find("host/cpu/model").text,
+            "cpuArch": capabilities_xml.find("host/cpu/arch").text,
+        }
+
     @staticmethod
     def get_host_memory(conn):
         """
@@ -231,21 +452,27 @@ class Libvirt(WorkerInterface):
             libversion = conn.getLibVersion()
             maj = int(libversion / 1000000)
             minor = int((libversion - maj * 1000000) / 1000)
-            host_capabilities_xml = self.get_host_capabilities(conn)
-            host_cpu_topology = self.get_host_cpu_topology(host_capabilities_xml)
-            totalCpuSockets = int(host_cpu_topology.get("sockets"))
-            totalCpuCores = int(host_cpu_topology.get("cores")) * totalCpuSockets
-            totalCpuThreads = int(host_cpu_topology.get("threads")) * totalCpuCores
+            topology = None
+            if self.topology_cache is not None:
+                topology = self.topology_cache.get(
+                    self.uri, hypervisor_hostname, libversion
+                )
+            if topology is None:
+                topology = self.get_host_topology(self.get_host_capabilities(conn))
+                if self.topology_cache is not None:
+                    self.topology_cache.put(
+                        self.uri, hypervisor_hostname, libversion, topology
+                    )
             output[hypervisor_hostname] = {
                 "name": hypervisor_hostname,
-                "hostIdentifier": host_capabilities_xml.find("host/uuid").text,
+                "hostIdentifier": topology["hostIdentifier"],
                 "type": conn.getType().lower(),
-                "totalCpuSockets": totalCpuSockets,
-                "totalCpuCores": totalCpuCores,
-                "totalCpuThreads": totalCpuThreads,
-                "cpuVendor": host_capabilities_xml.find("host/cpu/vendor").text,
-                "cpuDescription": host_capabilities_xml.find("host/cpu/model").text,
-                "cpuArch": host_capabilities_xml.find("host/cpu/arch").text,
+                "totalCpuSockets": topology["totalCpuSockets"],
+                "totalCpuCores": topology["totalCpuCores"],
+                "totalCpuThreads": topology["totalCpuThreads"],
+                "cpuVendor": topology["cpuVendor"],
+                "cpuDescription": topology["cpuDescription"],
+                "cpuArch": topology["cpuArch"],
                 "cpuMhz": 0,
                 "ramMb": int(self.get_host_memory(conn)),
                 "vms": {},
@@ -253,18 +480,68 @@ class Libvirt(WorkerInterface):
                 "os": "libvirt",
                 "osVersion": f"{maj}.{minor}",
             }
-            for domain in conn.listAllDomains(0):
-                domain_name = domain.name()
-                uuid = domain.UUIDString()
+            for domain_name, uuid, vm_data in self.get_domains(conn):
                 output[hypervisor_hostname]["vms"][domain_name] = uuid
-                output[hypervisor_hostname]["optionalVmData"][domain_name] = {}
-                output[hypervisor_hostname]["optionalVmData"][domain_name][
-                    "vmState"
-                ] = self.VMSTATE.get(domain.info()[0], "unknown")
+                output[hypervisor_hostname]["optionalVmData"][domain_name] = vm_data
         except libvirt.libvirtError as err:
             self.log.error(err)
+            self.mark_failed()
         return output
 
+    def get_domains(self, conn):
+        """
+        Get name, UUID and optional data of all domains.
+
+        The state of all domains, and with vm_details their vCPUs and memory,
+        is fetched with a single getAllDomainStats call. Name and UUID of the
+        returned domain objects are known on the client side. Older libvirt
+        versions fall back to an info() call per domain.
+
+        :param conn: a :py:class:`virConnect` instance
+        :return: List of (domain name, UUID, dictionary of optional data)
+        """
+
+        stats = libvirt.VIR_DOMAIN_STATS_STATE
+        if self.vm_details:
+            stats |= libvirt.VIR_DOMAIN_STATS_VCPU | libvirt.VIR_DOMAIN_STATS_BALLOON
+        try:
+            records = conn.getAllDomainStats(stats, 0)
+        except (AttributeError, libvirt.libvirtError) as err:
+            self.log.info("Bulk domain stats not available, using info(): %s", err)
+            records = None
+
+        if records is None:
+            return [self.get_domain(domain) for domain in conn.listAllDomains(0)]
+
+        domains = []
+
+        for domain, record in records:
+            vm_data = {
+                "vmState": self.VMSTATE.get(record.get("state.state"), "unknown")
+            }
+            if self.vm_details:
+                if "vcpu.current" in record:
+                    vm_data["vcpus"] = record["vcpu.current"]
+                if "balloon.current" in record:
+                    vm_data["ramMb"] = int(record["balloon.current"] / 1024)
+            domains.append((domain.name(), domain.UUIDString(), vm_data))
+        return domains
+
+    def get_domain(self, domain):
+        """
+        Get name, UUID and optional data of a domain with an info() call.
+
+        :param domain: a :py:class:`virDomain` instance
+        :return: Tuple of domain name, UUID and dictionary of optional data
+        """
+
+        state, _, memory, vcpus, _ = domain.info()
+        vm_data = {"vmState": self.VMSTATE.get(state, "unknown")}
+        if self.vm_details:
+            vm_data["vcpus"] = vcpus
+            vm_data["ramMb"] = int(memory / 1024)
+        return domain.name(), domain.UUIDString(), vm_data
+
     @staticmethod
     def request_cred(credentials, user_data):
         """
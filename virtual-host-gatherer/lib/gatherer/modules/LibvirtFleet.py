@@ -0,0 +1,370 @@
+# SPDX-FileCopyrightText: 2025 SUSE LLC
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# pylint: disable=invalid-name
+# Copyright (c) 2025 SUSE LLC, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Libvirt fleet Worker module implementation.
+
+Scans a list of libvirt hypervisors concurrently and merges their
+host/guest mappings into one output.
+"""
+
+from __future__ import print_function, absolute_import, division
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from gatherer.modules import WorkerInterface, MANIFEST
+from gatherer.modules import Libvirt as libvirt_module
+from gatherer.modules.Libvirt import Libvirt
+
+
+class TopologyCache(object):
+    """
+    Host topology parsed from the libvirt capabilities, keyed by host UUID
+    and libvirt version.
+
+    The capabilities only change with the hardware or the libvirt version,
+    so the parsed fields are reused instead of fetching and parsing the
+    capabilities XML on every scan. Entries expire after max_age seconds,
+    so a host replaced behind the same URI and name is picked up again.
+    """
+
+    MAX_AGE = 24 * 3600
+
+    def __init__(self, path=None, max_age=MAX_AGE):
+        """
+        Constructor.
+
+        :param path: JSON file to keep the cache in, or None for memory only.
+        :param max_age: Maximum age of an entry in seconds.
+        :return:
+        """
+
+        self.log = logging.getLogger(__name__)
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._changed = False
+        # uri -> host UUID, "UUID@libversion" -> entry
+        self._hosts = dict()
+        self._topology = dict()
+        if path:
+            self._load()
+
+    def get(self, uri, hostname, libversion):
+        """
+        Return the cached topology of a hypervisor.
+
+        :param uri: Connection URI of the hypervisor.
+        :param hostname: Host name reported by the hypervisor.
+        :param libversion: libvirt version reported by the hypervisor.
+        :return: Dictionary of the topology fields or None.
+        """
+
+        with self._lock:
+            uuid = self._hosts.get(uri)
+            entry = self._topology.get(f"{uuid}@{libversion}")
+        # A different host answering on the same URI is parsed again.
+        if entry is None or entry.get("name") != hostname:
+            return None
+        if not 0 <= time.time() - entry.get("timestamp", 0) <= self.max_age:
+            return None
+        return entry["topology"]
+
+    def put(self, uri, hostname, libversion, topology):
+        """
+        Store the topology of a hypervisor.
+
+        :param uri: Connection URI of the hypervisor.
+        :param hostname: Host name reported by the hypervisor.
+        :param libversion: libvirt version reported by the hypervisor.
+        :param topology: Dictionary of the topology fields.
+        :return: void
+        """
+
+        uuid = topology["hostIdentifier"]
+        with self._lock:
+            self._hosts[uri] = uuid
+            self._topology[f"{uuid}@{libversion}"] = {
+                "name": hostname,
+                "timestamp": time.time(),
+                "topology": topology,
+            }
+            self._changed = True
+
+    def save(self):
+        """
+        Write the cache file if entries were added.
+
+        :return: void
+        """
+
+        with self._lock:
+            if not self.path or not self._changed:
+                return
+            data = {"hosts": self._hosts, "topology": self._topology}
+            self._changed = False
+        try:
+            directory = os.path.dirname(self.path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as cache_file:
+                json.dump(data, cache_file)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as exc:
+            self.log.warning("Unable to write %s: %s", self.path, exc)
+
+    def _load(self):
+        """
+        Read the cache file, ignoring a missing or broken one.
+        """
+
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            self._hosts = dict(data["hosts"])
+            self._topology = dict(data["topology"])
+        except (IOError, OSError, ValueError, KeyError, TypeError) as exc:
+            self.log.debug("Topology cache %s not used: %s", self.path, exc)
+
+
+class LibvirtFleet(WorkerInterface):
+    """
+    Worker class for a fleet of libvirt hypervisors.
+    """
+
+    DEFAULT_PARAMETERS = MANIFEST["LibvirtFleet"]["parameters"]
+    PARALLEL = 4
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+        """
+
+        super().__init__()
+        self.log = logging.getLogger(__name__)
+        self.uris = []
+        self.parallel = self.PARALLEL
+        self.sasl_username = None
+        self.sasl_password = None
+        self.vm_details = None
+        self.events = None
+        self._topology_cache = None
+        # uri -> Libvirt worker kept by a persistent worker
+        self._members = dict()
+
+    # pylint: disable=R0801
+    # disable the duplicate code check
+    def set_node(self, node):
+        """
+        Set node information
+
+        :param node: Dictionary of the node description.
+        :return: void
+        """
+
+        try:
+            self._validate_parameters(node)
+        except AttributeError as error:
+            self.log.error(error)
+            raise error
+
+        self.uris = self._fleet_uris(node)
+        self.parallel = int(node.get("parallel") or self.PARALLEL)
+        self.sasl_username = node.get("sasl_username")
+        self.sasl_password = node.get("sasl_password")
+        self.vm_details = node.get("vm_details")
+        self.events = node.get("events")
+
+    def parameters(self):
+        """
+        Return default parameters
+
+        :return: default parameter dictionary
+        """
+
+        return self.DEFAULT_PARAMETERS
+
+    def run(self):
+        """
+        Start worker.
+        """
+
+        cache = self._topology()
+        output = dict()
+        with self.phase("fetch"):
+            with ThreadPoolExecutor(
+                max_workers=min(self.parallel, len(self.uris))
+            ) as executor:
+                results = list(executor.map(self._scan, self.uris))
+
+        failed = 0
+        for uri, result in zip(self.uris, results):
+            if result is None:
+                failed += 1
+                continue
+            for hostname, host in result.items():
+                if hostname in output:
+                    self.log.warning(
+                        "Host %s reported by %s was already scanned", hostname, uri
+                    )
+                output[hostname] = host
+        if failed:
+            self.log.error("%d of %d hypervisors failed", failed, len(self.uris))
+            self.mark_failed()
+        cache.save()
+        return output
+
+    def close(self):
+        """
+        Close the connections kept open by a persistent worker.
+
+        :return: void
+        """
+
+        members, self._members = self._members, dict()
+        for member in members.values():
+            member.close()
+
+    def valid(self):
+        """
+        Check plugin class validity.
+
+        :return: True if all components are installed
+        """
+
+        return libvirt_module.IS_VALID
+
+    def _validate_parameters(self, node):
+        """
+        Validate parameters.
+
+        :param node: Dictionary with the node description.
+        :return:
+        """
+
+        uris = self._fleet_uris(node)
+        if not uris:
+            raise AttributeError(
+                "Missing uris or uri_template and hosts parameters in infile"
+            )
+        if node.get("uri_template") and "{host}" not in node.get("uri_template"):
+            raise AttributeError("uri_template must contain {host}")
+        try:
+            if int(node.get("parallel") or self.PARALLEL) < 1:
+                raise ValueError()
+        except ValueError as exc:
+            raise AttributeError("parallel must be a positive integer") from exc
+
+        for uri in uris:
+            Libvirt.validate_uri(uri)
+
+    @staticmethod
+    def _split(value):
+        """
+        Return a list parameter given as list or as a comma or whitespace
+        separated string.
+        """
+
+        if not value:
+            return []
+        if isinstance(value, (list, tuple)):
+            return [str(item) for item in value if item]
+        return [item for item in re.split(r"[,\s]+", str(value)) if item]
+
+    def _fleet_uris(self, node):
+        """
+        Return the URIs of the fleet.
+
+        :param node: Dictionary with the node description.
+        :return: List of URIs, without duplicates.
+        """
+
+        uris = self._split(node.get("uris"))
+        template = node.get("uri_template")
+        if template:
+            uris += [
+                template.replace("{host}", host)
+                for host in self._split(node.get("hosts"))
+            ]
+        return list(dict.fromkeys(uris))
+
+    def _topology(self):
+        """
+        Return the topology cache, read from the cache directory on first use.
+        """
+
+        if self._topology_cache is None:
+            path = None
+            if self.cache_dir:
+                path = os.path.join(self.cache_dir, "libvirt-topology.json")
+            self._topology_cache = TopologyCache(path)
+        return self._topology_cache
+
+    def _member(self, uri):
+        """
+        Return the Libvirt worker scanning one hypervisor.
+
+        :param uri: Connection URI of the hypervisor.
+        :return: Libvirt worker instance.
+        """
+
+        member = self._members.get(uri)
+        if member is None:
+            member = Libvirt()
+            member.set_node(
+                dict(
+                    uri=uri,
+                    sasl_username=self.sasl_username,
+                    sasl_password=self.sasl_password,
+                    vm_details=self.vm_details,
+                    events=self.events,
+                )
+            )
+            member.persistent = self.persistent
+            member.topology_cache = self._topology()
+            if self.persistent:
+                self._members[uri] = member
+        return member
+
+    def _scan(self, uri):
+        """
+        Scan one hypervisor.
+
+        :param uri: Connection URI of the hypervisor.
+        :return: Host/guest mapping or None on failure.
+        """
+
+        member = self._member(uri)
+        member.reset_failed()
+        try:
+            result = member.run()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.error("Scanning %s failed: %s", uri, exc)
+            return None
+        # Count partial results of a hypervisor as failed.
+        return None if member.failed() else result
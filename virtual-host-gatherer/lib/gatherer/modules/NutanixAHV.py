@@ -23,16 +23,21 @@ NutanixAHV Worker module implementation.
 
 from __future__ import print_function, absolute_import
 import logging
+import asyncio
 import base64
+import collections
+import itertools
 import json
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+import queue
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from gatherer.modules import WorkerInterface, MANIFEST, run_in_thread
 
 try:
     try:
-        from urllib.request import urlopen, Request
+        from http.client import HTTPSConnection, HTTPException
     except ImportError:
-        from urllib2 import urlopen, Request
+        from httplib import HTTPSConnection, HTTPException
     IS_VALID = True
 except ImportError:
     IS_VALID = False
@@ -42,15 +47,104 @@ _PRISM_V2_API_PREFIX = "PrismGateway/services/rest/v2.0/"
 _PRISM_V2_API_HOSTS_ENDPOINT = _PRISM_V2_API_PREFIX + "hosts"
 _PRISM_V2_API_VMS_ENDPOINT = _PRISM_V2_API_PREFIX + "vms"
 
+_PRISM_V3_API_PREFIX = "api/nutanix/v3/"
+_PRISM_V3_API_CLUSTERS_ENDPOINT = _PRISM_V3_API_PREFIX + "clusters"
+_PRISM_V3_API_HOSTS_ENDPOINT = _PRISM_V3_API_PREFIX + "hosts"
+_PRISM_V3_API_VMS_ENDPOINT = _PRISM_V3_API_PREFIX + "vms"
+
+_DETACHED_HOST = "Nutanix-AHV-DetachedVMs"
+
+# Index key of the VMs without host_uuid
+_DETACHED = object()
+
+
+class _PrismConnectionPool(object):
+    """
+    Keep-alive HTTPS connections to a Prism API, shared by the threads
+    fetching pages.
+    """
+
+    def __init__(self, host, port, user, password):
+        """
+        Constructor.
+
+        :param host: Host name of Prism.
+        :param port: Port of Prism.
+        :param user: User name for the basic authentication.
+        :param password: Password for the basic authentication.
+        :return:
+        """
+
+        self.host = host
+        self.port = int(port)
+        auth_b64 = base64.b64encode(f"{user}:{password}".encode()).decode()
+        self.headers = {
+            "Authorization": f"Basic {auth_b64}",
+            "Accept": "application/json",
+        }
+        self._context = ssl.create_default_context()
+        self._idle = queue.LifoQueue()
+
+    def request(self, method, path, body=None):
+        """
+        Send a request on an idle connection and decode the JSON response.
+
+        A connection closed by the server while idle is opened again once.
+
+        :param method: HTTP method.
+        :param path: Path of the request, including the query.
+        :param body: Object to send as JSON body or None.
+        :return: Decoded JSON response.
+        """
+
+        headers = dict(self.headers)
+        if body is not None:
+            body = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = HTTPSConnection(self.host, self.port, context=self._context)
+        for retry in (False, True):
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (HTTPException, ConnectionError):
+                conn.close()
+                if retry:
+                    raise
+        if response.status != 200:
+            conn.close()
+            raise IOError(
+                f"{method} {path} failed: {response.status} {response.reason}"
+            )
+        self._idle.put(conn)
+        return json.loads(data)
+
+    def close(self):
+        """
+        Close the idle connections.
+
+        :return: void
+        """
+
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
 
 class NutanixAHV(WorkerInterface):
     """
     Worker class for NutanixAHV.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [("hostname", ""), ("port", 9440), ("username", ""), ("password", "")]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["NutanixAHV"]["parameters"]
+    PAGE_SIZE = 500
+    PARALLEL = 4
 
     VMSTATE = {
         "off": "stopped",
@@ -76,6 +170,10 @@ class NutanixAHV(WorkerInterface):
 
         self.log = logging.getLogger(__name__)
         self.host = self.port = self.user = self.password = None
+        self.page_size = self.PAGE_SIZE
+        self.parallel = self.PARALLEL
+        self.prism_central = False
+        self._pool = None
 
     # pylint: disable=R0801
     def set_node(self, node):
@@ -96,6 +194,15 @@ class NutanixAHV(WorkerInterface):
         self.port = node.get("port", 9440)
         self.user = node["username"]
         self.password = node["password"]
+        self.page_size = int(node.get("page_size") or self.PAGE_SIZE)
+        self.parallel = int(node.get("parallel") or self.PARALLEL)
+        self.prism_central = str(node.get("prism_central")).lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        if self._pool is not None:
+            self.close()
 
     def parameters(self):
         """
@@ -115,86 +222,472 @@ class NutanixAHV(WorkerInterface):
         output = dict()
         self.log.info("Connect to %s:%s as user %s", self.host, self.port, self.user)
 
-        base_url = f"https://{self.host}:{self.port}/"
-        auth_b64 = base64.b64encode(f"{self.user}:{self.password}".encode()).decode()
+        try:
+            if self._pool is None:
+                self._pool = _PrismConnectionPool(
+                    self.host, self.port, self.user, self.password
+                )
+            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+                if self.prism_central:
+                    self._scan_central(executor, output)
+                else:
+                    self._scan_element(executor, output)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.error(exc)
+            self.mark_failed()
+        finally:
+            if not self.persistent:
+                self.close()
+
+        return output
+
+    async def run_async(self):
+        """
+        Start worker from an asyncio event loop.
+
+        Every page is requested in its own thread over the keep-alive
+        connections, at most parallel pages at a time.
+
+        :return: Dictionary of the hosts in the worker scope.
+        """
+        output = dict()
+        self.log.info("Connect to %s:%s as user %s", self.host, self.port, self.user)
 
         try:
-            req = Request(base_url + _PRISM_V2_API_HOSTS_ENDPOINT)
-            req.add_header("Authorization", f"Basic {auth_b64}")
-            hosts_list = json.load(urlopen(req))
+            if self._pool is None:
+                self._pool = _PrismConnectionPool(
+                    self.host, self.port, self.user, self.password
+                )
+            slots = asyncio.Semaphore(self.parallel)
+            if self.prism_central:
+                endpoints = [
+                    _PRISM_V3_API_CLUSTERS_ENDPOINT,
+                    _PRISM_V3_API_VMS_ENDPOINT,
+                    _PRISM_V3_API_HOSTS_ENDPOINT,
+                ]
+            else:
+                endpoints = [_PRISM_V2_API_VMS_ENDPOINT, _PRISM_V2_API_HOSTS_ENDPOINT]
+            with self.phase("fetch"):
+                pages = await asyncio.gather(
+                    *(
+                        self._fetch_pages_async(slots, endpoint)
+                        for endpoint in endpoints
+                    )
+                )
+            if self.prism_central:
+                self._process_central(*pages, output)
+            else:
+                self._process_element(*pages, output)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.error(exc)
+            self.mark_failed()
+        finally:
+            if not self.persistent:
+                self.close()
+
+        return output
+
+    def close(self):
+        """
+        Close the connections kept open by a persistent worker.
+
+        :return: void
+        """
+
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def _validate_parameters(self, node):
+        """
+        Validate parameters.
+
+        :param node: Dictionary with the node description.
+        :return:
+        """
 
-            req = Request(base_url + _PRISM_V2_API_VMS_ENDPOINT)
-            req.add_header("Authorization", f"Basic {auth_b64}")
-            vms_list = json.load(urlopen(req))
+        super()._validate_parameters(node)
+        for param in ("page_size", "parallel"):
+            try:
+                if node.get(param) and int(node[param]) < 1:
+                    raise ValueError(node[param])
+            except ValueError as exc:
+                raise AttributeError(f"Invalid {param} '{node[param]}'") from exc
+
+    def _scan_element(self, executor, output):
+        """
+        Scan a Prism Element through the v2 API.
+
+        VM pages are sorted into an index by host UUID as they arrive, the
+        host records pick up their VMs from the index.
+
+        :param executor: Executor to run the requests on.
+        :param output: Dictionary of the hosts to fill.
+        :return: void
+        """
+
+        self._process_element(
+            self._fetch_pages(executor, _PRISM_V2_API_VMS_ENDPOINT),
+            self._fetch_pages(executor, _PRISM_V2_API_HOSTS_ENDPOINT),
+            output,
+        )
+
+    def _process_element(self, vm_pages, host_pages, output):
+        """
+        Convert the v2 VM and host pages of a Prism Element.
+
+        :param vm_pages: Iterable of the decoded VM list responses.
+        :param host_pages: Iterable of the decoded host list responses.
+        :param output: Dictionary of the hosts to fill.
+        :return: void
+        """
+
+        guests = dict()
+        for response in vm_pages:
+            with self.phase("transform"):
+                self._add_vms(response["entities"], guests)
+        for response in host_pages:
+            with self.phase("transform"):
+                self._add_hosts(response["entities"], guests, output)
+        output[_DETACHED_HOST] = self._detached_host(guests.get(_DETACHED))
+
+    def _scan_central(self, executor, output):
+        """
+        Scan all clusters registered in a Prism Central through the v3 API.
+
+        Works like _scan_element(), the VMs without a host are kept in a
+        detached host record per cluster.
+
+        :param executor: Executor to run the requests on.
+        :param output: Dictionary of the hosts to fill.
+        :return: void
+        """
 
-            for host in hosts_list["entities"]:
-                self.log.debug("Host=%s, uuid=%s", host["name"], host["uuid"])
+        self._process_central(
+            self._fetch_pages(executor, _PRISM_V3_API_CLUSTERS_ENDPOINT),
+            self._fetch_pages(executor, _PRISM_V3_API_VMS_ENDPOINT),
+            self._fetch_pages(executor, _PRISM_V3_API_HOSTS_ENDPOINT),
+            output,
+        )
 
-            for vm in vms_list["entities"]:
+    def _process_central(self, cluster_pages, vm_pages, host_pages, output):
+        """
+        Convert the v3 cluster, VM and host pages of a Prism Central.
+
+        :param cluster_pages: Iterable of the decoded cluster list responses.
+        :param vm_pages: Iterable of the decoded VM list responses.
+        :param host_pages: Iterable of the decoded host list responses.
+        :param output: Dictionary of the hosts to fill.
+        :return: void
+        """
+
+        clusters = dict()
+        for response in cluster_pages:
+            for cluster in response["entities"]:
+                resources = cluster.get("status", {}).get("resources", {})
+                services = resources.get("config", {}).get("service_list") or []
+                # Prism Central lists itself as a cluster without hosts.
+                if "PRISM_CENTRAL" not in services:
+                    clusters[cluster["metadata"]["uuid"]] = cluster["status"]["name"]
+        guests = dict()
+        for response in vm_pages:
+            with self.phase("transform"):
+                self._add_v3_vms(response["entities"], guests)
+        for response in host_pages:
+            with self.phase("transform"):
+                self._add_v3_hosts(response["entities"], guests, clusters, output)
+
+        detached = [key[1] for key in guests if isinstance(key, tuple)]
+        for cluster_uuid in list(clusters) + detached:
+            name = f"{_DETACHED_HOST}-{clusters.get(cluster_uuid, cluster_uuid)}"
+            if name not in output:
+                output[name] = self._detached_host(
+                    guests.get((_DETACHED, cluster_uuid)), name
+                )
+
+    def _fetch_pages(self, executor, endpoint):
+        """
+        Start fetching all pages of a Prism API list endpoint.
+
+        The first page is requested right away. The number of remaining pages
+        follows from its metadata, they are requested concurrently once it
+        arrived.
+
+        :param executor: Executor to run the requests on.
+        :param endpoint: Path of the endpoint relative to the Prism base URL.
+        :return: Generator of the decoded responses in page order.
+        """
+
+        return self._pages(
+            executor, endpoint, executor.submit(self._fetch_page, endpoint, 1)
+        )
+
+    def _pages(self, executor, endpoint, first_page):
+        """
+        Yield the pages of a list endpoint, see _fetch_pages().
+        """
+
+        with self.phase("fetch"):
+            response = first_page.result()
+        remaining = iter(range(2, self._page_count(response) + 1))
+        # Keep at most self.parallel pages in flight, so that a slow consumer
+        # does not hold every page of the endpoint in memory.
+        pages = collections.deque(
+            executor.submit(self._fetch_page, endpoint, page)
+            for page in itertools.islice(remaining, self.parallel)
+        )
+        yield response
+        while pages:
+            # Drop the reference to every page once it is processed.
+            future = pages.popleft()
+            for page in itertools.islice(remaining, 1):
+                pages.append(executor.submit(self._fetch_page, endpoint, page))
+            with self.phase("fetch"):
+                response = future.result()
+            yield response
+
+    async def _fetch_pages_async(self, slots, endpoint):
+        """
+        Fetch all pages of a Prism API list endpoint from an event loop.
+
+        :param slots: Semaphore limiting the concurrent requests.
+        :param endpoint: Path of the endpoint relative to the Prism base URL.
+        :return: List of the decoded responses in page order.
+        """
+
+        async def fetch(page):
+            async with slots:
+                return await run_in_thread(self._fetch_page, endpoint, page)
+
+        first = await fetch(1)
+        rest = await asyncio.gather(
+            *(fetch(page) for page in range(2, self._page_count(first) + 1))
+        )
+        return [first] + list(rest)
+
+    def _fetch_page(self, endpoint, page):
+        """
+        Fetch a page of a Prism API list endpoint.
+
+        The v2 endpoints are paged by page number, the v3 list calls by the
+        offset in the request body.
+
+        :param endpoint: Path of the endpoint relative to the Prism base URL.
+        :param page: Number of the page, starting with 1.
+        :return: Decoded JSON response.
+        """
+
+        if endpoint.startswith(_PRISM_V3_API_PREFIX):
+            return self._pool.request(
+                "POST",
+                f"/{endpoint}/list",
+                {
+                    # clusters -> cluster
+                    "kind": endpoint.rsplit("/", 1)[-1][:-1],
+                    "length": self.page_size,
+                    "offset": (page - 1) * self.page_size,
+                },
+            )
+        return self._pool.request(
+            "GET", f"/{endpoint}?count={self.page_size}&page={page}"
+        )
+
+    def _page_count(self, response):
+        """
+        Return the number of pages of a list endpoint.
+
+        :param response: Decoded response of the first page.
+        :return: Number of pages.
+        """
+
+        metadata = response.get("metadata") or dict()
+        total = metadata.get(
+            "total_entities",
+            metadata.get("grand_total_entities", metadata.get("total_matches")),
+        )
+        if total is None or len(response["entities"]) < self.page_size:
+            return 1
+        return -(-int(total) // self.page_size)
+
+    def _add_vms(self, vms, guests):
+        """
+        Add VMs to the index of guests by host UUID.
+
+        :param vms: List of the VM entities.
+        :param guests: Dictionary of (VMs, optional VM data) by host UUID.
+        :return: void
+        """
+
+        debug = self.log.isEnabledFor(logging.DEBUG)
+        for vm in vms:
+            host_uuid = vm.get("host_uuid", _DETACHED)
+            if debug:
                 self.log.debug(
                     "VM=%s, host_uuid=%s, state=%s",
                     vm["name"],
                     vm.get("host_uuid"),
                     vm["power_state"],
                 )
+            self._add_guest(
+                guests, host_uuid, vm["name"], vm["uuid"], vm["power_state"]
+            )
 
-            for host in hosts_list["entities"]:
-                output[host["name"]] = {
-                    "name": host["name"],
-                    "hostIdentifier": host["name"],
-                    "type": "nutanix",
-                    "os": "Nutanix AHV",
-                    "osVersion": host["hypervisor_full_name"],
-                    "totalCpuSockets": host["num_cpu_sockets"],
-                    "totalCpuCores": host["num_cpu_cores"],
-                    "totalCpuThreads": host["num_cpu_threads"],
-                    "cpuMhz": float(host["cpu_capacity_in_hz"]) / float(1000 * 1000),
-                    "cpuDescription": host["cpu_model"],
-                    "cpuArch": "x86_64",
-                    "ramMb": int(host["memory_capacity_in_bytes"] / (1024 * 1024)),
-                    "vms": {},
-                    "optionalVmData": {},
-                }
-
-                for vm in filter(
-                    # pylint: disable-next=cell-var-from-loop
-                    lambda x: x.get("host_uuid", "") == host["uuid"],
-                    vms_list["entities"],
-                ):
-                    output[host["name"]]["vms"][vm["name"]] = vm["uuid"]
-                    output[host["name"]]["optionalVmData"][vm["name"]] = {}
-                    output[host["name"]]["optionalVmData"][vm["name"]]["vmState"] = (
-                        self.VMSTATE.get(vm["power_state"], "unknown")
-                    )
+    def _add_v3_vms(self, vms, guests):
+        """
+        Add v3 VM entities to the index of guests by host UUID.
+
+        VMs without a host are indexed by (_DETACHED, cluster UUID).
+
+        :param vms: List of the v3 VM entities.
+        :param guests: Dictionary of (VMs, optional VM data) by host UUID.
+        :return: void
+        """
+
+        debug = self.log.isEnabledFor(logging.DEBUG)
+        for vm in vms:
+            status = vm.get("status") or dict()
+            resources = status.get("resources") or dict()
+            name = status.get("name") or vm["spec"]["name"]
+            power_state = (resources.get("power_state") or "").lower()
+            host = resources.get("host_reference")
+            if host:
+                key = host["uuid"]
+            else:
+                key = (_DETACHED, (status.get("cluster_reference") or {}).get("uuid"))
+            if debug:
+                self.log.debug(
+                    "VM=%s, host_uuid=%s, state=%s", name, host and key, power_state
+                )
+            self._add_guest(guests, key, name, vm["metadata"]["uuid"], power_state)
+
+    def _add_guest(self, guests, key, name, uuid, power_state):
+        """
+        Add a VM to the index of guests.
+
+        :param guests: Dictionary of (VMs, optional VM data) by host UUID.
+        :param key: Index key, the host UUID.
+        :param name: Name of the VM.
+        :param uuid: UUID of the VM.
+        :param power_state: Prism power state of the VM.
+        :return: void
+        """
+
+        entry = guests.get(key)
+        if entry is None:
+            entry = guests[key] = (dict(), dict())
+        entry[0][name] = uuid
+        entry[1][name] = {"vmState": self.VMSTATE.get(power_state, "unknown")}
+
+    def _add_hosts(self, hosts, guests, output):
+        """
+        Add host records with their VMs from the index to the output.
+
+        :param hosts: List of the host entities.
+        :param guests: Dictionary of (VMs, optional VM data) by host UUID.
+        :param output: Dictionary of the hosts to fill.
+        :return: void
+        """
 
-            output["Nutanix-AHV-DetachedVMs"] = {
-                "name": "Nutanix-AHV-DetachedVMs",
-                "hostIdentifier": "Nutanix-AHV-DetachedVMs",
+        for host in hosts:
+            self.log.debug("Host=%s, uuid=%s", host["name"], host["uuid"])
+            vms, vm_data = guests.get(host["uuid"]) or (dict(), dict())
+            output[host["name"]] = {
+                "name": host["name"],
+                "hostIdentifier": host["name"],
                 "type": "nutanix",
                 "os": "Nutanix AHV",
-                "osVersion": "Fake Host",
-                "totalCpuSockets": 0,
-                "totalCpuCores": 0,
-                "cpuMhz": 0,
+                "osVersion": host["hypervisor_full_name"],
+                "totalCpuSockets": host["num_cpu_sockets"],
+                "totalCpuCores": host["num_cpu_cores"],
+                "totalCpuThreads": host["num_cpu_threads"],
+                "cpuMhz": float(host["cpu_capacity_in_hz"]) / float(1000 * 1000),
+                "cpuDescription": host["cpu_model"],
                 "cpuArch": "x86_64",
-                "ramMb": 0,
-                "vms": {},
-                "optionalVmData": {},
+                "ramMb": int(host["memory_capacity_in_bytes"] / (1024 * 1024)),
+                "vms": vms,
+                "optionalVmData": vm_data,
             }
-            for vm in filter(
-                lambda x: x.get("host_uuid", "missing") == "missing",
-                vms_list["entities"],
-            ):
-                output["Nutanix-AHV-DetachedVMs"]["vms"][vm["name"]] = vm["uuid"]
-                output["Nutanix-AHV-DetachedVMs"]["optionalVmData"][vm["name"]] = {}
-                output["Nutanix-AHV-DetachedVMs"]["optionalVmData"][vm["name"]][
-                    "vmState"
-                ] = self.VMSTATE.get(vm["power_state"], "unknown")
 
-        except Exception as exc:  # pylint: disable=broad-exception-caught
-            self.log.error(exc)
+    def _add_v3_hosts(self, hosts, guests, clusters, output):
+        """
+        Add host records of v3 host entities with their VMs to the output.
 
-        return output
+        Host names are only unique within a cluster, a host named like one
+        of another cluster gets the cluster name appended.
+
+        :param hosts: List of the v3 host entities.
+        :param guests: Dictionary of (VMs, optional VM data) by host UUID.
+        :param clusters: Dictionary of the cluster names by cluster UUID.
+        :param output: Dictionary of the hosts to fill.
+        :return: void
+        """
+
+        for host in hosts:
+            status = host.get("status") or dict()
+            resources = status.get("resources") or dict()
+            hypervisor = resources.get("hypervisor")
+            if not hypervisor:
+                # Prism Central VMs are listed as hosts without hypervisor.
+                continue
+            uuid = host["metadata"]["uuid"]
+            name = status.get("name") or hypervisor.get("ip") or uuid
+            if name in output:
+                cluster_uuid = (status.get("cluster_reference") or dict()).get("uuid")
+                unique = f"{name}-{clusters.get(cluster_uuid, cluster_uuid or uuid)}"
+                self.log.warning(
+                    "Host name %s is used in several clusters, reporting %s as %s",
+                    name,
+                    uuid,
+                    unique,
+                )
+                name = unique
+            self.log.debug("Host=%s, uuid=%s", name, uuid)
+            vms, vm_data = guests.get(uuid) or (dict(), dict())
+            cores = resources.get("num_cpu_cores", 0)
+            output[name] = {
+                "name": name,
+                "hostIdentifier": name,
+                "type": "nutanix",
+                "os": "Nutanix AHV",
+                "osVersion": hypervisor.get("hypervisor_full_name"),
+                "totalCpuSockets": resources.get("num_cpu_sockets", 0),
+                "totalCpuCores": cores,
+                # v3 hosts do not always report threads, count one per core.
+                "totalCpuThreads": resources.get("num_cpu_threads", cores),
+                "cpuMhz": float(resources.get("cpu_capacity_hz", 0))
+                / float(1000 * 1000),
+                "cpuDescription": resources.get("cpu_model"),
+                "cpuArch": "x86_64",
+                "ramMb": int(resources.get("memory_capacity_mib", 0)),
+                "vms": vms,
+                "optionalVmData": vm_data,
+            }
+
+    @staticmethod
+    def _detached_host(guests, name=_DETACHED_HOST):
+        """
+        Return the fake host record holding the VMs without a host.
+
+        :param guests: Tuple of (VMs, optional VM data) or None.
+        :param name: Name of the record.
+        :return: Dictionary of the host record.
+        """
+
+        vms, vm_data = guests or (dict(), dict())
+        return {
+            "name": name,
+            "hostIdentifier": name,
+            "type": "nutanix",
+            "os": "Nutanix AHV",
+            "osVersion": "Fake Host",
+            "totalCpuSockets": 0,
+            "totalCpuCores": 0,
+            "cpuMhz": 0,
+            "cpuArch": "x86_64",
+            "ramMb": 0,
+            "vms": vms,
+            "optionalVmData": vm_data,
+        }
 
     def valid(self):
         """
@@ -24,8 +24,7 @@ SUSE Cloud Worker module implementation.
 from __future__ import print_function, absolute_import
 import json
 import logging
-from gatherer.modules import WorkerInterface
-from collections import OrderedDict
+from gatherer.modules import WorkerInterface, MANIFEST
 
 try:
     from novaclient.v1_1 import client
@@ -40,16 +39,7 @@ class SUSECloud(WorkerInterface):
     Worker class for the SUSE Cloud.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [
-            ("hostname", ""),
-            ("port", 5000),
-            ("username", ""),
-            ("password", ""),
-            ("protocol", "https"),
-            ("tenant", "openstack"),
-        ]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["SUSECloud"]["parameters"]
 
     # pylint: disable-next=super-init-not-called
     def __init__(self):
@@ -102,46 +92,49 @@ class SUSECloud(WorkerInterface):
         self.log.info(
             "Connect to %s for tenant %s as user %s", url, self.tenant, self.user
         )
-        cloud_client = client.Client(
-            self.user, self.password, self.tenant, url, service_type="compute"
-        )
-        for hyp in cloud_client.hypervisors.list():
-            htype = "qemu"
-            if hyp.hypervisor_type.lower() in [
-                "fully_virtualized",
-                "para_virtualized",
-                "qemu",
-                "vmware",
-                "hyperv",
-                "virtage",
-                "virtualbox",
-            ]:
-                htype = hyp.hypervisor_type.lower()
-            cpu_info = json.loads(hyp.cpu_info)
-            output[hyp.hypervisor_hostname] = {
-                "name": hyp.hypervisor_hostname,
-                "hostIdentifier": hyp.hypervisor_hostname,
-                "type": htype,
-                "os": hyp.hypervisor_type,
-                "osVersion": hyp.hypervisor_version,
-                "totalCpuSockets": cpu_info.get("topology", {}).get("sockets"),
-                "totalCpuCores": cpu_info.get("topology", {}).get("cores"),
-                "totalCpuThreads": cpu_info.get("topology", {}).get("threads"),
-                "cpuMhz": 0,
-                "cpuVendor": cpu_info.get("vendor"),
-                "cpuDescription": cpu_info.get("model"),
-                "cpuArch": cpu_info.get("arch"),
-                "ramMb": hyp.memory_mb,
-                "vms": {},
-            }
-            for result in cloud_client.hypervisors.search(
-                hyp.hypervisor_hostname, True
-            ):
-                if hasattr(result, "servers"):
-                    for virtual_machine in result.servers:
-                        output[hyp.hypervisor_hostname]["vms"][
-                            virtual_machine["name"]
-                        ] = virtual_machine["uuid"]
+        with self.phase("connect"):
+            cloud_client = client.Client(
+                self.user, self.password, self.tenant, url, service_type="compute"
+            )
+        # The client fetches lazily, so fetching and transforming interleave.
+        with self.phase("fetch"):
+            for hyp in cloud_client.hypervisors.list():
+                htype = "qemu"
+                if hyp.hypervisor_type.lower() in [
+                    "fully_virtualized",
+                    "para_virtualized",
+                    "qemu",
+                    "vmware",
+                    "hyperv",
+                    "virtage",
+                    "virtualbox",
+                ]:
+                    htype = hyp.hypervisor_type.lower()
+                cpu_info = json.loads(hyp.cpu_info)
+                output[hyp.hypervisor_hostname] = {
+                    "name": hyp.hypervisor_hostname,
+                    "hostIdentifier": hyp.hypervisor_hostname,
+                    "type": htype,
+                    "os": hyp.hypervisor_type,
+                    "osVersion": hyp.hypervisor_version,
+                    "totalCpuSockets": cpu_info.get("topology", {}).get("sockets"),
+                    "totalCpuCores": cpu_info.get("topology", {}).get("cores"),
+                    "totalCpuThreads": cpu_info.get("topology", {}).get("threads"),
+                    "cpuMhz": 0,
+                    "cpuVendor": cpu_info.get("vendor"),
+                    "cpuDescription": cpu_info.get("model"),
+                    "cpuArch": cpu_info.get("arch"),
+                    "ramMb": hyp.memory_mb,
+                    "vms": {},
+                }
+                for result in cloud_client.hypervisors.search(
+                    hyp.hypervisor_hostname, True
+                ):
+                    if hasattr(result, "servers"):
+                        for virtual_machine in result.servers:
+                            output[hyp.hypervisor_hostname]["vms"][
+                                virtual_machine["name"]
+                            ] = virtual_machine["uuid"]
 
         return output
 
@@ -26,11 +26,17 @@ VMWare Worker module implementation.
 from __future__ import print_function, absolute_import, division
 import logging
 import atexit
-from gatherer.modules import WorkerInterface
+import hashlib
+import os
+import queue
+import tempfile
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from gatherer.modules import WorkerInterface, MANIFEST
 
 try:
-    from pyVim.connect import SmartConnect, Disconnect
+    from pyVim.connect import SmartConnect, SmartStubAdapter, Disconnect
+    from pyVmomi import vim, vmodl
 
     IS_VALID = True
 except ImportError as ex:
@@ -42,12 +48,32 @@ class VMware(WorkerInterface):
     Worker class for the VMWare.
     """
 
-    DEFAULT_PARAMETERS = OrderedDict(
-        [("hostname", ""), ("port", 443), ("username", ""), ("password", "")]
-    )
+    DEFAULT_PARAMETERS = MANIFEST["VMware"]["parameters"]
 
     VMSTATE = {"poweredOff": "stopped", "poweredOn": "running", "suspended": "paused"}
 
+    # Properties retrieved with the property collector, exactly the ones
+    # the output is built from.
+    HOST_PROPERTIES = [
+        "summary.config.name",
+        "summary.config.product",
+        "hardware.cpuInfo",
+        "hardware.cpuPkg",
+        "hardware.memorySize",
+        "hardware.systemInfo",
+    ]
+    VM_PROPERTIES = [
+        "config.name",
+        "config.uuid",
+        "config.version",
+        "runtime.powerState",
+        "runtime.host",
+    ]
+
+    # Objects per property collector result page, unless the node sets
+    # page_size. Every page is converted before the next one is fetched.
+    PAGE_SIZE = 1000
+
     # pylint: disable-next=super-init-not-called
     def __init__(self):
         """
@@ -58,6 +84,12 @@ class VMware(WorkerInterface):
 
         self.log = logging.getLogger(__name__)
         self.host = self.port = self.user = self.password = None
+        self.page_size = self.PAGE_SIZE
+        self.session_cache = False
+        self.parallel = 1
+        self._connection = None
+        self._collector = self._view = None
+        self._reset_updates()
 
     # pylint: disable=R0801
     def set_node(self, node):
@@ -78,6 +110,13 @@ class VMware(WorkerInterface):
         self.port = node.get("port", 443)
         self.user = node["username"]
         self.password = node["password"]
+        self.page_size = int(node.get("page_size") or self.PAGE_SIZE)
+        self.session_cache = str(node.get("session_cache")).lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.parallel = int(node.get("parallel") or 1)
 
     def parameters(self):
         """
@@ -88,95 +127,444 @@ class VMware(WorkerInterface):
 
         return self.DEFAULT_PARAMETERS
 
-    def __explore_nodes(self, node, output):
+    @staticmethod
+    def _inventory_properties():
         """
-        Explore tree nodes in depth and process hosts
+        Return the properties to retrieve by managed object type.
         """
-        try:
-            if hasattr(node, "hostFolder"):
-                # child is now a "datacenter" and it can contain
-                # clusters or folders.
-                for child in node.hostFolder.childEntity:
-                    self.__explore_nodes(child, output)
-            elif hasattr(node, "childEntity"):
-                # vim.Folder
-                for child in node.childEntity:
-                    self.__explore_nodes(child, output)
-            elif hasattr(node, "host"):
-                # vim.Host
-                self.__process_node(node, output)
-        except Exception as exc:  # pylint: disable=broad-exception-caught
-            self.log.error("Unexpected error exploring nodes: %s", exc)
 
-    def __process_node(self, node, output):
+        return OrderedDict(
+            [
+                (vim.HostSystem, VMware.HOST_PROPERTIES),
+                (vim.VirtualMachine, VMware.VM_PROPERTIES),
+            ]
+        )
+
+    @staticmethod
+    def _filter_spec(view, properties, host_vms=False):
+        """
+        Return a property filter spec over all objects of a container view.
+
+        :param view: ContainerView managed object.
+        :param properties: Dictionary of property paths by managed object type.
+        :param host_vms: Also traverse from the hosts in the view to their VMs.
+        :return: vmodl.query.PropertyCollector.FilterSpec
+        """
+
+        query = vmodl.query.PropertyCollector
+        select_set = list()
+        if host_vms:
+            select_set.append(
+                query.TraversalSpec(
+                    name="traverseHostVms",
+                    path="vm",
+                    skip=False,
+                    type=vim.HostSystem,
+                )
+            )
+        return query.FilterSpec(
+            objectSet=[
+                query.ObjectSpec(
+                    obj=view,
+                    skip=True,
+                    selectSet=[
+                        query.TraversalSpec(
+                            name="traverseView",
+                            path="view",
+                            skip=False,
+                            type=vim.view.ContainerView,
+                            selectSet=select_set,
+                        )
+                    ],
+                )
+            ],
+            propSet=[
+                query.PropertySpec(type=obj_type, pathSet=paths)
+                for obj_type, paths in properties.items()
+            ],
+        )
+
+    def _validate_parameters(self, node):
+        """
+        Validate parameters.
+
+        :param node: Dictionary with the node description.
+        :return:
+        """
+
+        super()._validate_parameters(node)
+        for param in ("page_size", "parallel"):
+            try:
+                if node.get(param) and int(node[param]) < 1:
+                    raise ValueError(node[param])
+            except ValueError as exc:
+                raise AttributeError(f"Invalid {param} '{node[param]}'") from exc
+
+    def _retrieve(self, content, properties, container=None):
         """
-        Process parameters of a node and fill the output structure
+        Retrieve properties of all objects of the given types.
+
+        A container view over the inventory is traversed by the property
+        collector, so the values are fetched in a few batched calls instead
+        of one round trip per attribute.
+
+        With a container the view holds the hosts below it and the VMs are
+        reached from the hosts.
+
+        :param content: Service content of the connection.
+        :param properties: Dictionary of property paths by managed object type.
+        :param container: Managed object to limit the retrieval to or None.
+        :return: Generator of pages, lists of (object, dictionary of values).
         """
+
+        if container is None:
+            view = content.viewManager.CreateContainerView(
+                content.rootFolder, list(properties), True
+            )
+        else:
+            view = content.viewManager.CreateContainerView(
+                container, [vim.HostSystem], True
+            )
         try:
-            # vim.ClusterComputeResource
-            for host in node.host:
-                host_name = host.summary.config.name.split()[0]
-                mhz = float(host.hardware.cpuInfo.hz) / float(1000 * 1000)
-                ram = int(host.hardware.memorySize / (1024 * 1024))
-
-                self.log.debug(
-                    "Host identification for %s -> UUID: %s Vendor: %s Serial Number: %s",
-                    str(host),
-                    host.hardware.systemInfo.uuid,
-                    host.hardware.systemInfo.vendor,
-                    host.hardware.systemInfo.serialNumber,
+            collector = content.propertyCollector
+            result = collector.RetrievePropertiesEx(
+                [self._filter_spec(view, properties, container is not None)],
+                vmodl.query.PropertyCollector.RetrieveOptions(
+                    maxObjects=self.page_size
+                ),
+            )
+            while result is not None:
+                yield [
+                    (item.obj, {prop.name: prop.val for prop in item.propSet or []})
+                    for item in result.objects
+                ]
+                if not result.token:
+                    break
+                result = collector.ContinueRetrievePropertiesEx(result.token)
+        finally:
+            view.Destroy()
+
+    def _host_entry(self, host, props):
+        """
+        Build the output entry of a host from its retrieved properties.
+
+        :param host: HostSystem managed object.
+        :param props: Dictionary of the HOST_PROPERTIES values.
+        :return: Tuple of the host name and the output entry.
+        """
+
+        host_name = props["summary.config.name"].split()[0]
+        product = props["summary.config.product"]
+        cpu_info = props["hardware.cpuInfo"]
+        cpu_pkg = props["hardware.cpuPkg"]
+        system_info = props["hardware.systemInfo"]
+        mhz = float(cpu_info.hz) / float(1000 * 1000)
+        ram = int(props["hardware.memorySize"] / (1024 * 1024))
+
+        self.log.debug(
+            "Host identification for %s -> UUID: %s Vendor: %s Serial Number: %s",
+            str(host),
+            system_info.uuid,
+            system_info.vendor,
+            system_info.serialNumber,
+        )
+
+        return host_name, {
+            "type": "vmware",
+            "name": host_name,
+            "hostIdentifier": system_info.uuid,
+            "fallbackHostIdentifier": str(host),
+            "os": product.name,
+            "osVersion": product.version,
+            "totalCpuSockets": cpu_info.numCpuPackages,
+            "totalCpuCores": cpu_info.numCpuCores,
+            "totalCpuThreads": cpu_info.numCpuThreads,
+            "cpuMhz": mhz,
+            "cpuVendor": cpu_pkg[0].vendor,
+            "cpuDescription": cpu_pkg[0].description.strip(),
+            "cpuArch": "x86_64",
+            "ramMb": ram,
+            "vms": {},
+            "optionalVmData": {},
+        }
+
+    def _guest_entry(self, virtual_machine, props):
+        """
+        Build the output data of a VM from its retrieved properties.
+
+        :param virtual_machine: VirtualMachine managed object.
+        :param props: Dictionary of the VM_PROPERTIES values.
+        :return: Tuple of the host reference, VM name, UUID and optional data,
+            or None, if the VM is skipped.
+        """
+
+        # NOTE: 'vm.config is not always available. Skipping vm if it is missing.
+        # Ref: https://pubs.vmware.com/vi3/sdk/ReferenceGuide/vim.VirtualMachine.html
+        if "config.name" not in props or "config.uuid" not in props:
+            self.log.warning("Missing config for vm %s. Skipping it.", virtual_machine)
+            return None
+        if props.get("runtime.host") is None:
+            return None
+        return (
+            str(props["runtime.host"]),
+            props["config.name"],
+            self.convert_vm_uuid(props["config.uuid"], props.get("config.version")),
+            {
+                "vmState": self.VMSTATE.get(props.get("runtime.powerState"), "unknown"),
+                "vmware_uuid": props["config.uuid"],
+            },
+        )
+
+    def _add_objects(self, objects, output, hosts, guests):
+        """
+        Convert retrieved hosts and VMs into output entries.
+
+        VMs are added to their host entry right away, the ones retrieved
+        before their host are appended to `guests`.
+
+        :param objects: Iterable of (object, dictionary of property values).
+        :param output: Dictionary of the host entries by host name.
+        :param hosts: Dictionary of the host entries by host reference.
+        :param guests: List of the VMs waiting for their host.
+        :return: void
+        """
+
+        for obj, props in objects:
+            if isinstance(obj, vim.HostSystem):
+                try:
+                    host_name, entry = self._host_entry(obj, props)
+                except (AttributeError, KeyError, IndexError) as exc:
+                    self.log.error("Unexpected error processing host %s: %s", obj, exc)
+                    self.mark_failed()
+                    continue
+                output[host_name] = hosts[str(obj)] = entry
+            else:
+                guest = self._guest_entry(obj, props)
+                if guest is not None and not self._add_guest(hosts, guest):
+                    guests.append(guest)
+
+    @staticmethod
+    def _add_guest(hosts, guest):
+        """
+        Add a VM to the entry of its host.
+
+        :param hosts: Dictionary of the host entries by host reference.
+        :param guest: Tuple returned by _guest_entry().
+        :return: True, if the host is known.
+        """
+
+        host_ref, vmname, vm_uuid, vm_data = guest
+        entry = hosts.get(host_ref)
+        if entry is None:
+            return False
+        entry["vms"][vmname] = vm_uuid
+        entry["optionalVmData"][vmname] = vm_data
+        return True
+
+    def _scan_full(self, content, output, hosts, guests):
+        """
+        Retrieve all hosts and VMs, converting them page by page.
+
+        The hosts are retrieved first, so every page of VMs can be added to
+        the host entries and dropped before the next page is fetched.
+
+        :param content: Service content of the connection.
+        :param output: Dictionary of the host entries by host name.
+        :param hosts: Dictionary of the host entries by host reference.
+        :param guests: List of the VMs waiting for their host.
+        :return: void
+        """
+
+        for obj_type, paths in self._inventory_properties().items():
+            pages = self._retrieve(content, {obj_type: paths})
+            try:
+                while True:
+                    with self.phase("fetch"):
+                        page = next(pages, None)
+                    if page is None:
+                        break
+                    with self.phase("transform"):
+                        self._add_objects(page, output, hosts, guests)
+            finally:
+                pages.close()
+
+    def _scan_parallel(self, connection, content, output, hosts, guests):
+        """
+        Retrieve the hosts and VMs cluster by cluster over several connections.
+
+        Every compute resource, a cluster or a standalone host, is retrieved
+        on its own. Up to `parallel` retrievals run at the same time over
+        service instances sharing the session of the connection.
+
+        :param connection: Service instance of the logged in session.
+        :param content: Service content of the connection.
+        :param output: Dictionary of the host entries by host name.
+        :param hosts: Dictionary of the host entries by host reference.
+        :param guests: List of the VMs waiting for their host.
+        :return: void
+        """
+
+        with self.phase("fetch"):
+            resources = [
+                obj
+                for page in self._retrieve(
+                    content, OrderedDict([(vim.ComputeResource, ["name"])])
                 )
+                for obj, _ in page
+            ]
+        workers = min(self.parallel, len(resources)) or 1
+        self.log.info(
+            "Scanning %d compute resources over %d connections",
+            len(resources),
+            workers,
+        )
+
+        pool = queue.Queue()
+        pool.put(connection)
+        for _ in range(workers - 1):
+            pool.put(None)
+
+        def scan(resource):
+            part = (dict(), dict(), list())
+            instance = pool.get()
+            try:
+                if instance is None:
+                    instance = self._clone_connection(connection)
+                for page in self._retrieve(
+                    instance.RetrieveContent(),
+                    self._inventory_properties(),
+                    resource,
+                ):
+                    self._add_objects(page, *part)
+            finally:
+                pool.put(instance)
+            return part
+
+        # The phases of the parallel retrievals overlap, they count as fetch.
+        with self.phase("fetch"):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for part_output, part_hosts, part_guests in executor.map(
+                    scan, resources
+                ):
+                    output.update(part_output)
+                    hosts.update(part_hosts)
+                    guests.extend(part_guests)
+
+    def _clone_connection(self, connection):
+        """
+        Return a new service instance sharing the session of a connection.
 
-                output[host_name] = {
-                    "type": "vmware",
-                    "name": host_name,
-                    "hostIdentifier": host.hardware.systemInfo.uuid,
-                    "fallbackHostIdentifier": str(host),
-                    "os": host.summary.config.product.name,
-                    "osVersion": host.summary.config.product.version,
-                    "totalCpuSockets": host.hardware.cpuInfo.numCpuPackages,
-                    "totalCpuCores": host.hardware.cpuInfo.numCpuCores,
-                    "totalCpuThreads": host.hardware.cpuInfo.numCpuThreads,
-                    "cpuMhz": mhz,
-                    "cpuVendor": host.hardware.cpuPkg[0].vendor,
-                    "cpuDescription": host.hardware.cpuPkg[0].description.strip(),
-                    "cpuArch": "x86_64",
-                    "ramMb": ram,
-                    "vms": {},
-                    "optionalVmData": {},
-                }
-
-                # If an additional hardware info is wanted:
-                # print "pciDevice: %s" % host.hardware.pciDevice
-                for virtual_machine in host.vm:
-                    # print "Guest: %s" % vm.config.name
-                    # print "Guest State: %s" % vm.runtime.powerState
-                    # print "Guest CPUs: %s" % vm.summary.config.numCpu
-                    # print "Guest RAM: %s" % vm.summary.config.memorySizeMB
-                    # NOTE: 'vm.config is not always available. Skipping vm if an exception is raised.
-                    # Ref: https://pubs.vmware.com/vi3/sdk/ReferenceGuide/vim.VirtualMachine.html
-                    try:
-                        vmname = virtual_machine.config.name
-                        output[host_name]["vms"][vmname] = self.get_vm_uuid(
-                            virtual_machine
-                        )
-                        output[host_name]["optionalVmData"][vmname] = {}
-                        output[host_name]["optionalVmData"][vmname]["vmState"] = (
-                            self.VMSTATE.get(
-                                virtual_machine.runtime.powerState, "unknown"
-                            )
-                        )
-                        output[host_name]["optionalVmData"][vmname][
-                            "vmware_uuid"
-                        ] = virtual_machine.config.uuid
-                    except AttributeError:
-                        self.log.warning(
-                            "Missing config for vm %s. Skipping it.",
-                            virtual_machine.summary.vm,
-                        )
+        :param connection: Service instance of the logged in session.
+        :return: Service instance.
+        """
 
-        except (AttributeError, KeyError, IndexError) as exc:
-            self.log.error("Unexpected error processing node: %s", exc)
+        stub = SmartStubAdapter(host=self.host, port=int(self.port))
+        # pylint: disable-next=protected-access
+        stub.cookie = connection._stub.cookie
+        return vim.ServiceInstance("ServiceInstance", stub)
+
+    def _scan_updates(self, content, output, hosts, guests):
+        """
+        Fetch the changes since the previous run and convert the merged state.
+
+        The first run of a persistent worker creates a property filter over
+        all hosts and VMs on an own property collector and receives the full
+        inventory as updates. Later runs only receive the objects which
+        changed since the version of the previous run.
+
+        :param content: Service content of the connection.
+        :param output: Dictionary of the host entries by host name.
+        :param hosts: Dictionary of the host entries by host reference.
+        :param guests: List of the VMs waiting for their host.
+        :return: void
+        """
+
+        if self._collector is None:
+            with self.phase("fetch"):
+                properties = self._inventory_properties()
+                view = content.viewManager.CreateContainerView(
+                    content.rootFolder, list(properties), True
+                )
+                collector = content.propertyCollector.CreatePropertyCollector()
+                collector.CreateFilter(
+                    self._filter_spec(view, properties), partialUpdates=False
+                )
+            self._collector = collector
+            self._view = view
+            self._version = ""
+            self._objects = OrderedDict()
+
+        options = vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=0, maxObjectUpdates=self.page_size
+        )
+        changed = 0
+        while True:
+            with self.phase("fetch"):
+                update_set = self._collector.WaitForUpdatesEx(self._version, options)
+            if update_set is None:
+                break
+            with self.phase("transform"):
+                changed += self._apply_updates(update_set)
+            self._version = update_set.version
+            if not update_set.truncated:
+                break
+        self.log.info("%d inventory objects changed since the last scan", changed)
+
+        with self.phase("transform"):
+            self._add_objects(self._objects.values(), output, hosts, guests)
+
+    def _apply_updates(self, update_set):
+        """
+        Merge a property collector update set into the kept inventory.
+
+        :param update_set: vmodl.query.PropertyCollector.UpdateSet
+        :return: Number of changed objects.
+        """
+
+        changed = 0
+        for filter_update in update_set.filterSet or []:
+            for update in filter_update.objectSet or []:
+                changed += 1
+                key = str(update.obj)
+                if update.kind == "leave":
+                    self._objects.pop(key, None)
+                    continue
+                if update.kind == "enter" or key not in self._objects:
+                    self._objects[key] = (update.obj, dict())
+                props = self._objects[key][1]
+                for change in update.changeSet or []:
+                    if change.op in ("remove", "indirectRemove"):
+                        props.pop(change.name, None)
+                    else:
+                        props[change.name] = change.val
+                for missing in update.missingSet or []:
+                    props.pop(missing.path, None)
+        return changed
+
+    def _reset_updates(self):
+        """
+        Forget the property collector state of the incremental updates.
+
+        The collector and the container view are destroyed on the server,
+        which fails harmlessly when the session is already gone.
+
+        :return: void
+        """
+
+        if self._collector is not None:
+            try:
+                self._collector.DestroyPropertyCollector()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                self.log.debug("Destroying the property collector failed: %s", exc)
+        if self._view is not None:
+            try:
+                self._view.Destroy()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                self.log.debug("Destroying the container view failed: %s", exc)
+        self._collector = None
+        self._view = None
+        self._version = ""
+        self._objects = OrderedDict()
 
     def run(self):
         """
@@ -185,15 +573,7 @@ class VMware(WorkerInterface):
         :return: Dictionary of the hosts in the worker scope.
         """
 
-        self.log.info("Connect to %s:%s as user %s", self.host, self.port, self.user)
-        try:
-            connection = SmartConnect(
-                host=self.host, user=self.user, pwd=self.password, port=int(self.port)
-            )
-            atexit.register(Disconnect, connection)
-        except IOError as ex:
-            self.log.error(ex)
-            connection = None
+        connection = self._connect()
         if connection is None:
             self.log.error(
                 "Could not connect to the specified host using specified "
@@ -201,13 +581,191 @@ class VMware(WorkerInterface):
             )
             return
 
-        content = connection.RetrieveContent()
         output = dict()
-        for child in content.rootFolder.childEntity:
-            self.__explore_nodes(child, output)
-        Disconnect(connection)
+        hosts = dict()
+        guests = list()
+        try:
+            with self.phase("fetch"):
+                content = connection.RetrieveContent()
+            if self.persistent:
+                try:
+                    self._scan_updates(content, output, hosts, guests)
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    self.log.warning(
+                        "Incremental update failed, retrieving everything: %s", exc
+                    )
+                    self._reset_updates()
+                    output.clear()
+                    hosts.clear()
+                    del guests[:]
+                    self._scan_full(content, output, hosts, guests)
+            elif self.parallel > 1:
+                self._scan_parallel(connection, content, output, hosts, guests)
+            else:
+                self._scan_full(content, output, hosts, guests)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.log.error("Unexpected error exploring nodes: %s", exc)
+            self.mark_failed()
+
+        with self.phase("transform"):
+            for guest in guests:
+                self._add_guest(hosts, guest)
+        if not self.persistent and not self.session_cache:
+            Disconnect(connection)
         return output
 
+    def close(self):
+        """
+        Log out the session kept open by a persistent worker.
+
+        :return: void
+        """
+
+        connection, self._connection = self._connection, None
+        self._reset_updates()
+        if connection is not None and not self.session_cache:
+            try:
+                Disconnect(connection)
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                self.log.debug("Disconnect failed: %s", ex)
+
+    def _connect(self):
+        """
+        Connect to the vCenter or reuse the session of a persistent worker.
+
+        :return: Service instance or None, if the connection failed.
+        """
+
+        if self._connection is not None:
+            if self._session_alive(self._connection):
+                return self._connection
+            self.log.info(
+                "Session to %s:%s expired, reconnecting", self.host, self.port
+            )
+            self._connection = None
+
+        connection = self._cached_session() if self.session_cache else None
+        if connection is None:
+            connection = self._login()
+        if self.persistent:
+            # Property collectors belong to the previous session.
+            self._reset_updates()
+            self._connection = connection
+        return connection
+
+    def _login(self):
+        """
+        Log in to the vCenter.
+
+        :return: Service instance or None, if the login failed.
+        """
+
+        self.log.info("Connect to %s:%s as user %s", self.host, self.port, self.user)
+        try:
+            with self.phase("connect"):
+                connection = SmartConnect(
+                    host=self.host,
+                    user=self.user,
+                    pwd=self.password,
+                    port=int(self.port),
+                )
+        except IOError as ex:
+            self.log.error(ex)
+            return None
+        if self.session_cache:
+            self._store_session(connection)
+        elif not self.persistent:
+            # Persistent workers log out in close().
+            atexit.register(Disconnect, connection)
+        return connection
+
+    def _session_path(self):
+        """
+        Return the path of the session cookie file of the host and user.
+
+        :return: Path or None, if there is no cache directory.
+        """
+
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha256(
+            f"{self.host}:{self.port}:{self.user}".encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, "vmware-sessions", key)
+
+    def _cached_session(self):
+        """
+        Resume the session of a stored cookie, if it is still logged in.
+
+        :return: Service instance or None.
+        """
+
+        path = self._session_path()
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as cookie_file:
+                cookie = cookie_file.read().strip()
+        except (IOError, OSError):
+            return None
+
+        with self.phase("connect"):
+            try:
+                stub = SmartStubAdapter(host=self.host, port=int(self.port))
+                stub.cookie = cookie
+                connection = vim.ServiceInstance("ServiceInstance", stub)
+                alive = self._session_alive(connection)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                self.log.debug("Cached session not usable: %s", exc)
+                alive = False
+        if not alive:
+            self.log.info("Cached session for %s:%s expired", self.host, self.port)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        self.log.info("Reusing cached session for %s:%s", self.host, self.port)
+        return connection
+
+    def _store_session(self, connection):
+        """
+        Store the session cookie of a connection, readable by the owner only.
+
+        :param connection: Service instance.
+        :return: void
+        """
+
+        path = self._session_path()
+        cookie = getattr(getattr(connection, "_stub", None), "cookie", None)
+        if path is None or not cookie:
+            return
+        try:
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+            # mkstemp creates the file with mode 0600.
+            handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as cookie_file:
+                cookie_file.write(cookie)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as exc:
+            self.log.warning("Unable to store the session cookie: %s", exc)
+
+    @staticmethod
+    def _session_alive(connection):
+        """
+        Check whether the session of a connection is still logged in.
+
+        :param connection: Service instance.
+        :return: True, if the session can be reused.
+        """
+
+        try:
+            return connection.content.sessionManager.currentSession is not None
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False
+
     def valid(self):
         """
         Check plugin class validity.
@@ -218,14 +776,34 @@ class VMware(WorkerInterface):
         return IS_VALID
 
     def get_vm_uuid(self, virtual_machine):
+        """
+        Return the UUID of a VM as reported by dmidecode inside the VM.
+
+        :param virtual_machine: VirtualMachine managed object.
+        :return: UUID string.
+        """
+
+        return self.convert_vm_uuid(
+            virtual_machine.config.uuid, virtual_machine.config.version
+        )
+
+    @staticmethod
+    def convert_vm_uuid(uuid_s, hw_version):
+        """
+        Convert the UUID of a VM to the one reported by dmidecode.
+
+        :param uuid_s: UUID from the VM config.
+        :param hw_version: Hardware version of the VM, e.g. "vmx-19".
+        :return: UUID string.
+        """
+
         # For hardware verions >=13, convert endianess on the first 3 groups
         # For example:
         # 42224e1b-f0b3-bd55-39c2-263f3860836f - vmware (for hardware versions >=13)
         # is converted to
         # 1b4e2242-b3f0-55bd-39c2-263f3860836f - dmidecode
-        uuid_s = virtual_machine.config.uuid
-        if virtual_machine.config.version:
-            version = int(virtual_machine.config.version.split("-")[1])
+        if hw_version:
+            version = int(hw_version.split("-")[1])
             if version >= 13:
                 group1 = uuid_s[6:8] + uuid_s[4:6] + uuid_s[2:4] + uuid_s[0:2] + "-"
                 group2 = uuid_s[11:13] + uuid_s[9:11] + "-"
@@ -23,6 +23,207 @@ Contains worker interface.
 from __future__ import absolute_import
 from six import with_metaclass
 import abc
+import asyncio
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+
+# Static description of the bundled modules: the node parameters with their
+# default values and the top-level packages a module needs to be operable.
+# It answers --list-modules and lets the gatherer decide which modules can
+# be used without importing the heavy SDKs.
+MANIFEST = OrderedDict(
+    [
+        (
+            "AmazonEC2",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("access_key_id", ""),
+                        ("secret_access_key", ""),
+                        ("region", ""),
+                        ("zone", ""),
+                        ("page_size", None),
+                    ]
+                ),
+                "requires": ["libcloud"],
+            },
+        ),
+        (
+            "Azure",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("subscription_id", ""),
+                        ("application_id", ""),
+                        ("tenant_id", ""),
+                        ("secret_key", ""),
+                        ("zone", ""),
+                    ]
+                ),
+                "requires": ["libcloud"],
+            },
+        ),
+        (
+            "File",
+            {
+                "parameters": OrderedDict([("url", "")]),
+                "requires": ["pycurl"],
+            },
+        ),
+        (
+            "GoogleCE",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("service_account_email", ""),
+                        ("cert_path", ""),
+                        ("project_id", ""),
+                        ("zone", ""),
+                    ]
+                ),
+                "requires": ["libcloud"],
+            },
+        ),
+        (
+            "Kubernetes",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("kubeconfig", ""),
+                        ("context", ""),
+                        ("contexts", None),
+                        ("page_size", None),
+                    ]
+                ),
+                "requires": ["kubernetes", "urllib3"],
+            },
+        ),
+        (
+            "Libvirt",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("uri", ""),
+                        ("sasl_username", None),
+                        ("sasl_password", None),
+                        ("vm_details", None),
+                        ("events", None),
+                    ]
+                ),
+                "requires": ["libvirt"],
+            },
+        ),
+        (
+            "LibvirtFleet",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("uris", None),
+                        ("uri_template", None),
+                        ("hosts", None),
+                        ("parallel", None),
+                        ("sasl_username", None),
+                        ("sasl_password", None),
+                        ("vm_details", None),
+                        ("events", None),
+                    ]
+                ),
+                "requires": ["libvirt"],
+            },
+        ),
+        (
+            "NutanixAHV",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("hostname", ""),
+                        ("port", 9440),
+                        ("username", ""),
+                        ("password", ""),
+                        ("page_size", None),
+                        ("parallel", None),
+                        ("prism_central", None),
+                    ]
+                ),
+                "requires": [],
+            },
+        ),
+        (
+            "SUSECloud",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("hostname", ""),
+                        ("port", 5000),
+                        ("username", ""),
+                        ("password", ""),
+                        ("protocol", "https"),
+                        ("tenant", "openstack"),
+                    ]
+                ),
+                "requires": ["novaclient.v1_1"],
+            },
+        ),
+        (
+            "VMware",
+            {
+                "parameters": OrderedDict(
+                    [
+                        ("hostname", ""),
+                        ("port", 443),
+                        ("username", ""),
+                        ("password", ""),
+                        ("page_size", None),
+                        ("session_cache", None),
+                        ("parallel", None),
+                    ]
+                ),
+                "requires": ["pyVim"],
+            },
+        ),
+    ]
+)
+
+
+def run_in_thread(func, *args):
+    """
+    Run a blocking callable in a daemon thread.
+
+    Unlike the executors of the event loop, a daemon thread does not keep
+    the process alive if the scan is abandoned after a deadline.
+
+    :param func: Callable to run.
+    :param args: Positional arguments for the callable.
+    :return: asyncio future with the result of the callable.
+    """
+
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    def _resolve(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _target():
+        # pylint: disable=broad-exception-caught
+        try:
+            result, error = func(*args), None
+        except Exception as exc:
+            result, error = None, exc
+        try:
+            loop.call_soon_threadsafe(_resolve, result, error)
+        except RuntimeError:
+            # The event loop is already closed, nobody waits for the result.
+            pass
+
+    threading.Thread(target=_target, daemon=True).start()
+    return future
 
 
 # pylint: disable=abstract-class-not-used
@@ -31,6 +232,14 @@ class WorkerInterface(with_metaclass(abc.ABCMeta, object)):
     Worker definition interface.
     """
 
+    # Set by the gatherer daemon on instances kept between scan requests.
+    # Persistent workers keep their connections open after run() until
+    # close() is called.
+    persistent = False
+
+    # Directory for state kept between gatherer runs, set by the gatherer.
+    cache_dir = None
+
     @abc.abstractmethod
     def set_node(self, node):
         """
@@ -57,6 +266,24 @@ class WorkerInterface(with_metaclass(abc.ABCMeta, object)):
         """
         return dict()
 
+    async def run_async(self):
+        """
+        Run the worker from an asyncio event loop.
+
+        The default implementation runs the blocking run() in a thread.
+        Modules which can fetch their data concurrently may override it.
+
+        :return: Dictionary of the worker result.
+        """
+        return await run_in_thread(self.run)
+
+    def close(self):
+        """
+        Release the connections kept open by a persistent worker.
+
+        :return: void
+        """
+
     @abc.abstractmethod
     def valid(self):
         """
@@ -66,13 +293,82 @@ class WorkerInterface(with_metaclass(abc.ABCMeta, object)):
         """
         return False
 
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Measure the time spent in a phase of the scan.
+
+        Modules wrap their work in the phases "connect", "fetch" and
+        "transform". A phase may be entered several times, the durations add up.
+
+        :param name: Name of the phase.
+        :return: Context manager.
+        """
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            timings = vars(self).setdefault("_phase_timings", dict())
+            timings[name] = timings.get(name, 0.0) + time.monotonic() - start
+
+    def phase_timings(self):
+        """
+        Return the measured phase durations.
+
+        :return: Dictionary of seconds by phase name.
+        """
+
+        return dict(vars(self).get("_phase_timings", dict()))
+
+    def reset_phase_timings(self):
+        """
+        Forget the measured phase durations before reusing the worker.
+
+        :return: void
+        """
+
+        vars(self).pop("_phase_timings", None)
+
+    def mark_failed(self):
+        """
+        Flag the current scan as failed.
+
+        Modules call it when they log an error and return partial output,
+        so the result is not cached.
+
+        :return: void
+        """
+
+        vars(self)["_failed"] = True
+
+    def failed(self):
+        """
+        Return True, if the current scan was flagged as failed.
+        """
+
+        return vars(self).get("_failed", False)
+
+    def reset_failed(self):
+        """
+        Clear the failure flag before reusing the worker.
+
+        :return: void
+        """
+
+        vars(self).pop("_failed", None)
+
     def _validate_parameters(self, node):
         """
         Validate parameters.
 
+        Parameters with None as default value are optional.
+
         :param node: Dictionary with the node description.
         :return:
         """
-        for param in self.parameters():
+        for param, default in self.parameters().items():
+            if default is None:
+                continue
             if not node.get(param):
                 raise AttributeError(f"Missing parameter or value '{param}' in infile")
@@ -87,7 +87,9 @@ Kubernetes connection module for gatherer
 Summary:        Azure, Amazon AWS EC2 and Google Compute connection module
 Group:          Development/Languages
 Requires:       %{name} = %{version}
-Requires:       %{python_module apache-libcloud}
+# AmazonEC2 uses the private EC2NodeDriver._to_nodes()
+Requires:       %{python_module apache-libcloud >= 2.0}
+Requires:       %{python_module apache-libcloud < 4}
 
 %description libcloud
 Azure, Amazon AWS EC2 and Google Compute Engine connection module
@@ -193,5 +195,7 @@ rm -rf %{buildroot}
 %defattr(-,root,root,-)
 %{python_sitelib}/gatherer/modules/Libvirt.py*
 %{python_sitelib}/gatherer/modules/__pycache__/Libvirt.*
+%{python_sitelib}/gatherer/modules/LibvirtFleet.py*
+%{python_sitelib}/gatherer/modules/__pycache__/LibvirtFleet.*
 
 %changelog